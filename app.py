@@ -1,20 +1,53 @@
+# Imported first, so the startup profile also covers the imports below.
+from startup import lazy_import, startup_profile
 from databricks.sdk.core import Config
 from databricks.sdk import WorkspaceClient
 from databricks.sdk.service.compute import Policy, PolicyFamily
 import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 from streamlit_extras.st_keyup import st_keyup
 import json
+import re
+import uuid
 from collections import OrderedDict
+from dataclasses import replace
+from datetime import datetime, timezone
 
 from attributes import supported_attributes
+from preview import render_definition
+from history import DraftHistory, Snapshot
+from versions import PolicyVersion, PolicyVersionStore
+from runtimes import RuntimeCatalog
+from attribute_trie import AttributeTrie
+from lint import LintContext, LintEngine
+from usage import PolicyUsage, PolicyUsageTracker
+from permissions import PolicyPermissionIndex, principal_label
+from workspaces import (
+    CURRENT_WORKSPACE, DEFAULT_MAX_REQUESTS, DEFAULT_MAX_TARGETS, drift_matrix, list_profiles, profile_client,
+    promote_policy,
+)
+from canonical import canonical_json, content_hash, loads, policy_content
+from drafts import Draft, DraftStore
+from families import FamilyDefinitionCache, reevaluate_policies
 
-
-# Databricks config
-cfg = Config()
+# Only needed by some code paths, so loaded on first use. See `python startup.py --check`.
+fleet = lazy_import('fleet')
+regex_tester = lazy_import('regex_tester')
+simulate = lazy_import('simulate')
+startup_profile.mark('imports')
 
 # Initialize streamlit
 st.set_page_config(layout="wide")
 
+# Databricks config
+@st.cache_resource(show_spinner=False)
+def databricks_config() -> Config:
+    # Resolving auth may shell out to the Databricks CLI or call a metadata service, so only do it once.
+    return Config()
+
+cfg = databricks_config()
+startup_profile.mark('config')
+
 st.session_state['cloud'] = cfg.environment.cloud
 if 'inputs' not in st.session_state:
     st.session_state['inputs'] = {}
@@ -36,33 +69,100 @@ if 'policy_family_id' not in st.session_state:
     st.session_state['policy_family_id'] = None
 if 'editing_policy' not in st.session_state:
     st.session_state['editing_policy'] = None
-    
+if 'workspace_cache_cursor' not in st.session_state:
+    st.session_state['workspace_cache_cursor'] = 0
+if 'draft_history' not in st.session_state:
+    st.session_state['draft_history'] = DraftHistory('New policy', {}, {})
+
+# Events only live for a single full app run, see `dispatch_events`.
+st.session_state['events'] = set()
 
 def clear_inputs():
     st.session_state['inputs'] = {}
 
 
+# ===== Events =====
+
+# The sidebar, editor and preview are fragments, so interacting with one of them only
+# reruns that fragment. When an interaction changes state that other parts of the page
+# render, it emits an event and the fragment escalates to a full app rerun.
+POLICY_LOADED = 'policy_loaded'
+DEFINITION_CHANGED = 'definition_changed'
+
+def emit_event(event: str):
+    st.session_state['events'].add(event)
+
+def dispatch_events():
+    """Rerun the full app if the current fragment run emitted any events"""
+    events = st.session_state['events']
+    st.session_state['events'] = set()
+    # A full run already renders everything the events affect, so only fragment runs escalate.
+    ctx = get_script_run_ctx()
+    if events and ctx is not None and ctx.fragment_ids_this_run:
+        st.rerun()
+
+
 # ===== Logic =====
 
 @st.cache_resource(show_spinner='Talking to your Databricks workspace...')
 def workspace_client() -> WorkspaceClient:
     # user_token = st.context.headers.get('X-Forwarded-Access-Token')
     return WorkspaceClient(
+        config=databricks_config(),
         # host=cfg.host,
         # token=user_token
     )
 
+@st.cache_resource
+def version_store() -> PolicyVersionStore:
+    return PolicyVersionStore()
+
+@st.cache_resource
+def draft_store() -> DraftStore:
+    return DraftStore()
+
+@st.cache_resource(show_spinner=False)
+def policy_usage_tracker() -> PolicyUsageTracker:
+    return PolicyUsageTracker(workspace_client())
+
+@st.cache_resource(show_spinner=False)
+def policy_permission_index() -> PolicyPermissionIndex:
+    return PolicyPermissionIndex(workspace_client())
+
 @st.cache_data(ttl='1 hour', show_spinner='Discovering cluster policies...')
 def list_cluster_policies(cache_cursor: int) -> list[Policy]:
     """List all cluster policies in the workspace"""
     w = workspace_client()
-    return w.cluster_policies.list()
+    return list(w.cluster_policies.list())
+
+@st.cache_resource(show_spinner=False)
+def workspace_profile_client(profile: str) -> WorkspaceClient:
+    return profile_client(profile)
+
+@st.cache_data(ttl='1 hour', show_spinner=False)
+def list_workspace_policies(profile: str, cache_cursor: int) -> list[Policy]:
+    """List all cluster policies in another registered workspace"""
+    return list(workspace_profile_client(profile).cluster_policies.list())
+
+def load_workspace_catalogs(profiles: list[str]) -> dict[str, list[Policy]]:
+    """Cached policy catalogs of this workspace and the given profiles"""
+    catalogs = {CURRENT_WORKSPACE: list_cluster_policies(st.session_state['cache_cursor'])}
+    for profile in profiles:
+        with st.spinner(f'Loading policies from {profile}...'):
+            catalogs[profile] = list_workspace_policies(profile, st.session_state['workspace_cache_cursor'])
+    return catalogs
+
+@st.cache_resource
+def family_cache() -> FamilyDefinitionCache:
+    return FamilyDefinitionCache()
 
 @st.cache_data(ttl='24 hours', show_spinner='Loading policy families...')
 def load_policy_families() -> list[PolicyFamily]:
-    """List all policy families in the workspace"""
+    """List all policy families in the workspace, recording any new family versions"""
     w = workspace_client()
-    return list(w.policy_families.list())
+    families = list(w.policy_families.list())
+    family_cache().update(families)
+    return families
 
 @st.cache_data(ttl='24 hours', show_spinner='Loading Available Spark Versions...')
 def load_available_spark_versions() -> list[str]:
@@ -74,34 +174,61 @@ def load_available_spark_versions() -> list[str]:
 
 st.session_state['spark_versions'] = load_available_spark_versions()
 
+@st.cache_resource(ttl='24 hours', show_spinner=False)
+def load_runtime_catalog() -> RuntimeCatalog:
+    """Parse and index the available spark versions once, for filtering in the attribute editor"""
+    return RuntimeCatalog.from_versions(load_available_spark_versions())
+
+st.session_state['runtime_catalog'] = load_runtime_catalog()
+startup_profile.mark('spark versions')
+
+@st.cache_resource(ttl='24 hours', show_spinner=False)
+def lint_engine() -> LintEngine:
+    """Governance rules, with findings cached per policy content for as long as the runtime catalog is current"""
+    return LintEngine(context=LintContext(runtime_catalog=load_runtime_catalog()))
+
 @st.cache_data(ttl='1 hour', show_spinner='Loading instance profiles...')
 def load_instance_profiles():
     """List all instance profiles in the workspace"""
     w = workspace_client()
     return [i.instance_profile_arn for i in w.instance_profiles.list()]
 
-st.session_state['instance_profiles'] = load_instance_profiles()
+# Like cluster attributes below, these are only listed once an attribute editor needs them.
+st.session_state['load_instance_profiles'] = load_instance_profiles
 
 @st.cache_data(ttl='24 hours', show_spinner=False)
 def load_zones():
     w = workspace_client()
     return w.clusters.list_zones().zones
 
-st.session_state['zones'] = load_zones()
+st.session_state['load_zones'] = load_zones
 
 @st.cache_data(ttl='24 hours', show_spinner='Loading node types...')
 def load_node_types():
     w = workspace_client()
     return [n.node_type_id for n in w.clusters.list_node_types().node_types]
 
-st.session_state['node_types'] = load_node_types()
+st.session_state['load_node_types'] = load_node_types
 
 @st.cache_data(ttl='1 hour', show_spinner='Loading Instance Pools...')
 def load_instance_pools():
     w = workspace_client()
     return {p.instance_pool_id: p.instance_pool_name for p in w.instance_pools.list()}
 
-st.session_state['instance_pools'] = load_instance_pools()
+st.session_state['load_instance_pools'] = load_instance_pools
+
+@st.cache_resource(ttl='1 hour', show_spinner='Loading cluster configurations...')
+def load_cluster_attribute_index() -> AttributeTrie:
+    """Values of every attribute of every cluster in the workspace, to test regex constraints against"""
+    w = workspace_client()
+    return regex_tester.attribute_index([regex_tester.flatten_attributes(c.as_dict()) for c in w.clusters.list()])
+
+@st.cache_data(ttl='1 hour', show_spinner=False)
+def load_cluster_attribute_values(attribute_name: str) -> tuple[str, ...]:
+    return regex_tester.attribute_values(load_cluster_attribute_index(), attribute_name)
+
+# Listing every cluster is slow in large workspaces, so the attribute editor calls this only when needed.
+st.session_state['load_cluster_attribute_values'] = load_cluster_attribute_values
 
 def add_inputs_to_definition():
     # Certain attributes, like array attributes and custom tags, have itemized naming.
@@ -110,10 +237,14 @@ def add_inputs_to_definition():
         attribute_name = st.session_state['override_attribute_name_select']
 
     # When using a Family, the definition itself is not editable, but the overrides are.
-    if st.session_state.get('policy_family_id'):
+    is_override = bool(st.session_state.get('policy_family_id'))
+    if is_override:
         st.session_state['overrides'][attribute_name] = st.session_state['inputs']
     else:
         st.session_state['definition'][attribute_name] = st.session_state['inputs']
+    st.session_state['draft_history'].set_attribute(
+        f'Set {attribute_name}', attribute_name, st.session_state['inputs'], override=is_override,
+    )
 
     # Remove any staged attribute type selections.
     for key in st.session_state.keys():
@@ -123,6 +254,7 @@ def add_inputs_to_definition():
     st.session_state['attribute_name_select'] = None
     st.session_state['override_attribute_name_select'] = None
     clear_inputs()
+    emit_event(DEFINITION_CHANGED)
 
 def load_policy(policy: Policy):
     clear_inputs()
@@ -131,9 +263,9 @@ def load_policy(policy: Policy):
         w = workspace_client()
         policy = w.cluster_policies.get(policy.policy_id)
 
-    st.session_state['definition'] = json.loads(policy.definition)
+    st.session_state['definition'] = loads(policy.definition)
     if policy.policy_family_definition_overrides:
-        st.session_state['overrides'] = json.loads(policy.policy_family_definition_overrides)
+        st.session_state['overrides'] = loads(policy.policy_family_definition_overrides)
     else:
         st.session_state['overrides'] = {}
     st.session_state['editing_policy'] = policy
@@ -141,16 +273,182 @@ def load_policy(policy: Policy):
     st.session_state['policy_name'] = policy.name
     st.session_state['policy_description'] = policy.description
     st.session_state['policy_family_id'] = policy.policy_family_id
+    st.session_state['draft_history'] = DraftHistory(
+        f'Loaded {policy.name}', st.session_state['definition'], st.session_state['overrides'],
+    )
+    new_draft()
+    mark_draft_saved()
+    emit_event(POLICY_LOADED)
 
 def clone_policy():
     cloned_policy_name = st.session_state['editing_policy'].name
-    st.session_state['definition'] = json.loads(st.session_state['editing_policy'].definition)
+    st.session_state['definition'] = loads(st.session_state['editing_policy'].definition)
     st.session_state['editing_policy'] = None
+    st.session_state['draft_history'].replace(
+        f'Cloned {cloned_policy_name}', st.session_state['definition'], st.session_state['overrides'],
+    )
+    # The clone isn't saved anywhere yet, even though it matches the original.
+    new_draft()
+    st.session_state['draft_saved_hash'] = None
     st.info(
         f'**{cloned_policy_name}** cloned. You may continue making changes to the Policy, and click **Save Policy** to create a new policy without affecting the original.',
         icon=':material/info:',
     )
 
+def record_policy_version(kind: str, policy: Policy):
+    """Record the state of a policy in the local version store"""
+    version_store().record(
+        policy.policy_id,
+        kind,
+        name=policy.name,
+        description=policy.description,
+        max_clusters_per_user=policy.max_clusters_per_user,
+        policy_family_id=policy.policy_family_id,
+        definition=loads(policy.definition or '{}'),
+        overrides=loads(policy.policy_family_definition_overrides or '{}'),
+    )
+
+def record_live_version(policy_id: str) -> Policy:
+    """Record the policy as it is in the workspace right before it is overwritten, and return it"""
+    # The editor's copy may be days old, e.g. from a restored draft, and miss edits made in the workspace since.
+    live_policy = workspace_client().cluster_policies.get(policy_id)
+    record_policy_version('before', live_policy)
+    return live_policy
+
+def rollback_policy(version: PolicyVersion):
+    """Restore the editing policy to a recorded version, straight from the local version store"""
+    store = version_store()
+    editing_policy = st.session_state['editing_policy']
+    definition = store.get_definition(version.definition)
+    overrides = store.get_definition(version.overrides)
+    request_args = {
+        'policy_id': editing_policy.policy_id,
+        'name': version.name,
+        'description': version.description,
+        'max_clusters_per_user': version.max_clusters_per_user,
+    }
+    if version.policy_family_id:
+        request_args['policy_family_id'] = version.policy_family_id
+        request_args['policy_family_definition_overrides'] = canonical_json(overrides)
+    else:
+        request_args['definition'] = canonical_json(definition)
+
+    with st.spinner('Rolling back policy...'):
+        request_args['libraries'] = record_live_version(editing_policy.policy_id).libraries
+        workspace_client().cluster_policies.edit(**request_args)
+    rolled_back_policy = replace(
+        editing_policy,
+        name=version.name,
+        description=version.description,
+        max_clusters_per_user=version.max_clusters_per_user,
+        policy_family_id=version.policy_family_id,
+        definition=canonical_json(definition),
+        policy_family_definition_overrides=request_args.get('policy_family_definition_overrides'),
+    )
+    record_policy_version('rollback', rolled_back_policy)
+
+    clear_inputs()
+    st.session_state['definition'] = definition
+    st.session_state['overrides'] = overrides
+    st.session_state['editing_policy'] = rolled_back_policy
+    st.session_state['max_clusters_per_user'] = version.max_clusters_per_user
+    st.session_state['policy_name'] = version.name
+    st.session_state['policy_description'] = version.description
+    st.session_state['policy_family_id'] = version.policy_family_id
+    st.session_state['draft_history'] = DraftHistory(f'Rolled back {version.name}', definition, overrides)
+    st.session_state['cache_cursor'] += 1
+    mark_draft_saved()
+    emit_event(POLICY_LOADED)
+
+def restore_snapshot(snapshot: Snapshot):
+    st.session_state['definition'] = snapshot.definition.to_dict()
+    st.session_state['overrides'] = snapshot.overrides.to_dict()
+
+def undo_edit():
+    restore_snapshot(st.session_state['draft_history'].undo())
+
+def redo_edit():
+    restore_snapshot(st.session_state['draft_history'].redo())
+
+def jump_to_edit():
+    restore_snapshot(st.session_state['draft_history'].jump(st.session_state['history_select']))
+    emit_event(DEFINITION_CHANGED)
+
+
+# ===== Drafts =====
+
+# Outside Databricks Apps, e.g. when running locally, there is no forwarded email.
+LOCAL_USER = 'local'
+
+def current_user() -> str:
+    return st.context.headers.get('X-Forwarded-Email') or LOCAL_USER
+
+def draft_content() -> dict:
+    """The editor state a draft keeps"""
+    return {
+        'name': st.session_state.get('policy_name') or None,
+        'description': st.session_state.get('policy_description') or None,
+        'max_clusters_per_user': st.session_state.get('max_clusters_per_user') or None,
+        'policy_family_id': st.session_state.get('policy_family_id'),
+        'definition': st.session_state['definition'],
+        'overrides': st.session_state['overrides'],
+    }
+
+def new_draft():
+    st.session_state['draft_id'] = uuid.uuid4().hex
+
+def mark_draft_saved():
+    """Treat the editor as having no unsaved changes, e.g. right after a policy is loaded or saved"""
+    st.session_state['draft_saved_hash'] = content_hash(draft_content())
+
+def autosave_draft():
+    """Queue the editor state to be written to the draft store, or discard the draft if nothing is unsaved"""
+    content = draft_content()
+    draft_hash = content_hash(content)
+    if draft_hash == st.session_state.get('draft_autosaved_hash'):
+        return
+    st.session_state['draft_autosaved_hash'] = draft_hash
+    if draft_hash == st.session_state.get('draft_saved_hash') or not (content['definition'] or content['overrides']):
+        draft_store().discard(current_user(), st.session_state['draft_id'])
+        return
+    editing_policy = st.session_state.get('editing_policy')
+    draft_store().save(current_user(), Draft(
+        draft_id=st.session_state['draft_id'],
+        updated_at=datetime.now(timezone.utc).isoformat(),
+        editing_policy=editing_policy.as_dict() if editing_policy else None,
+        **content,
+    ))
+
+def restore_draft(draft: Draft):
+    clear_inputs()
+    st.session_state['draft_id'] = draft.draft_id
+    st.session_state['definition'] = draft.definition
+    st.session_state['overrides'] = draft.overrides
+    st.session_state['editing_policy'] = Policy.from_dict(draft.editing_policy) if draft.editing_policy else None
+    st.session_state['max_clusters_per_user'] = draft.max_clusters_per_user
+    st.session_state['policy_name'] = draft.name
+    st.session_state['policy_description'] = draft.description
+    st.session_state['policy_family_id'] = draft.policy_family_id
+    st.session_state['draft_history'] = DraftHistory(
+        f'Restored draft of {draft.name or "untitled policy"}', draft.definition, draft.overrides,
+    )
+    st.session_state['draft_saved_hash'] = None
+    st.session_state['draft_autosaved_hash'] = content_hash(draft_content())
+    emit_event(POLICY_LOADED)
+
+def discard_draft(draft_id: str):
+    draft_store().discard(current_user(), draft_id)
+
+# Pick up where the user left off on their last visit, before any widget renders the editor state.
+if 'draft_id' not in st.session_state:
+    unsaved_drafts = draft_store().list_drafts(current_user())
+    if unsaved_drafts:
+        restore_draft(unsaved_drafts[0])
+        st.toast(f'Restored your unsaved draft **{unsaved_drafts[0].label}**', icon=':material/restore:')
+    else:
+        new_draft()
+        mark_draft_saved()
+
 # ===== Toast Notifications =====
 
 if st.session_state.get('newly_created_policy_id'):
@@ -169,6 +467,7 @@ if st.session_state.get('newly_created_policy_id'):
     st.session_state['newly_created_policy_id'] = None
     st.session_state['newly_created_policy_name'] = None
     st.session_state['definition'] = {}
+    st.session_state['draft_history'] = DraftHistory('New policy', {}, st.session_state['overrides'])
 
 if st.session_state.get('editing_policy'):
     existing_policy_url = f"{cfg.host}/compute/policies/{st.session_state['editing_policy'].policy_id}"
@@ -199,7 +498,7 @@ def create_policy_dialog():
     st.write(_message)
 
     st.write('#### View Policy JSON:')
-    st.json(st.session_state['definition'], expanded=False)
+    render_definition(st.session_state['definition'], key='dialog_definition', expanded=False)
 
     # Input the policy name
     policy_name = st.text_input(
@@ -225,31 +524,48 @@ def create_policy_dialog():
     if max_clusters_per_user == 0:
         max_clusters_per_user = None
 
+    request_args = {
+        'name': policy_name,
+        'max_clusters_per_user': max_clusters_per_user,
+        'description': policy_description,
+    }
+    if st.session_state.get('policy_family_id'):
+        request_args['policy_family_id'] = st.session_state['policy_family_id']
+        request_args['policy_family_definition_overrides'] = canonical_json(st.session_state['overrides'])
+    else:
+        request_args['definition'] = canonical_json(st.session_state['definition'])
+
+    # Skip the round trip when the draft is equivalent to what is already saved.
+    unchanged = bool(editing_policy) and (
+        content_hash(policy_content(Policy(**request_args))) == content_hash(policy_content(editing_policy))
+    )
+    if unchanged:
+        st.caption('No changes to save.')
+
     # Add a button to create the policy
     button_label = 'Create Policy' if not editing_policy else 'Update Policy'
-    if st.button(button_label, key='submit_create_policy_button', use_container_width=True, disabled=not policy_name):
+    if st.button(button_label, key='submit_create_policy_button', use_container_width=True, disabled=not policy_name or unchanged):
         w = workspace_client()
-        request_args = {
-            'name': policy_name,
-            'max_clusters_per_user': max_clusters_per_user,
-            'description': policy_description,
-        }
-        if st.session_state.get('policy_family_id'):
-            request_args['policy_family_id'] = st.session_state['policy_family_id']
-            request_args['policy_family_definition_overrides'] = json.dumps(st.session_state['overrides'])
-        else:
-            request_args['definition'] = json.dumps(st.session_state['definition'])
 
         # Make the API call to create or update the policy
         if editing_policy:
             request_args['policy_id'] = editing_policy.policy_id
-            request_args['libraries'] = editing_policy.libraries
+            request_args['libraries'] = record_live_version(editing_policy.policy_id).libraries
             w.cluster_policies.edit(**request_args)
             st.session_state['newly_created_policy_id'] = editing_policy.policy_id
         else:
             resp = w.cluster_policies.create(**request_args)
             st.session_state['newly_created_policy_id'] = resp.policy_id
 
+        # Keep a local record of what was saved, so the policy can be rolled back later.
+        saved_policy = Policy(
+            policy_id=st.session_state['newly_created_policy_id'],
+            definition=canonical_json(st.session_state['definition']),
+            **{k: v for k, v in request_args.items() if k not in ('policy_id', 'definition')},
+        )
+        record_policy_version('after', saved_policy)
+        discard_draft(st.session_state['draft_id'])
+
         # Refresh the policy list
         st.session_state['newly_created_policy_name'] = policy_name
         st.session_state['cache_cursor'] += 1
@@ -257,6 +573,8 @@ def create_policy_dialog():
         st.session_state['policy_description'] = None
         st.session_state['max_clusters_per_user'] = None
         st.session_state['policy_family_id'] = None
+        new_draft()
+        mark_draft_saved()
         st.rerun()
 
 @st.dialog('Start New Policy')
@@ -272,10 +590,218 @@ def start_new_policy_dialog():
         st.session_state['policy_name'] = None
         st.session_state['policy_description'] = None
         st.session_state['max_clusters_per_user'] = None
+        st.session_state['draft_history'] = DraftHistory('New policy', {}, {})
+        discard_draft(st.session_state['draft_id'])
+        new_draft()
+        mark_draft_saved()
         st.rerun()
     if st.button('Cancel', use_container_width=True, type='secondary'):
         st.rerun() # nothing, just closes the dialog
 
+@st.dialog('Patch Policies', width='large')
+def fleet_patch_dialog():
+    st.write('Set one attribute to the same constraint across every policy that matches the selector.')
+    attribute_path = st.text_input('Attribute Path', placeholder='autotermination_minutes', key='fleet_attribute_path')
+    constraint_json = st.text_area(
+        'Constraint',
+        placeholder='{"type": "range", "maxValue": 120}',
+        key='fleet_constraint',
+        help='The policy attribute definition to set, as JSON',
+    )
+
+    st.write('###### Select Policies')
+    selector_cols = st.columns(2)
+    with selector_cols[0]:
+        name_pattern = st.text_input('Name Pattern', placeholder='.*', help='Regex matched against policy names')
+        policy_families = load_policy_families()
+        family_option_labels = {p.policy_family_id: p.name for p in policy_families}
+        policy_family_id = st.selectbox(
+            'Family',
+            options=list(family_option_labels.keys()),
+            index=None,
+            format_func=lambda x: family_option_labels[x],
+            key='fleet_policy_family_id',
+        )
+    with selector_cols[1]:
+        exclude_name_pattern = st.text_input('Exclude Name Pattern', placeholder='admin', help='Regex of policy names to skip')
+        has_attribute = st.checkbox('Only policies that already set this attribute')
+
+    if not attribute_path or not constraint_json:
+        return
+    try:
+        constraint = json.loads(constraint_json)
+    except json.JSONDecodeError as e:
+        st.error(f'Constraint is not valid JSON: {e}', icon=':material/error:')
+        return
+    if not isinstance(constraint, dict):
+        st.error('Constraint must be a JSON object, e.g. `{"type": "fixed", "value": 60}`', icon=':material/error:')
+        return
+    # Patterns are re-planned on every keystroke, so half-typed ones like `(prod` are common.
+    for label, pattern in (('Name Pattern', name_pattern), ('Exclude Name Pattern', exclude_name_pattern)):
+        try:
+            re.compile(pattern)
+        except re.error as e:
+            st.error(f'{label} is not a valid regex: {e}', icon=':material/error:')
+            return
+
+    selector = fleet.PolicySelector(
+        name_pattern=name_pattern or None,
+        exclude_name_pattern=exclude_name_pattern or None,
+        policy_family_id=policy_family_id,
+        has_attribute=attribute_path if has_attribute else None,
+    )
+    patches = fleet.plan_patch(list_cluster_policies(st.session_state['cache_cursor']), attribute_path, constraint, selector)
+    st.write(f'#### {len(patches)} policies will change')
+    if not patches:
+        return
+    st.dataframe(fleet.summarize_patches(patches), use_container_width=True)
+    with st.expander('Policies'):
+        st.write('\n'.join(f'- {p.policy.name}' for p in patches))
+
+    max_workers = st.number_input('Concurrent Writers', min_value=1, max_value=32, value=DEFAULT_MAX_REQUESTS)
+    if st.button(f'Patch {len(patches)} Policies', type='primary', use_container_width=True):
+        with st.spinner('Patching policies...'):
+            results = fleet.apply_patches(workspace_client(), patches, max_workers=max_workers)
+        patches_by_id = {p.policy.policy_id: p for p in patches}
+        for result in results:
+            if result.ok:
+                record_policy_version('before', patches_by_id[result.policy_id].policy)
+                record_policy_version('after', patches_by_id[result.policy_id].patched_policy())
+        st.session_state['cache_cursor'] += 1
+
+        failed = [r for r in results if not r.ok]
+        if failed:
+            st.error(f'{len(failed)} of {len(results)} policies failed to update.', icon=':material/error:')
+        else:
+            st.success(f'Patched {len(results)} policies.', icon=':material/check_circle:')
+        st.dataframe(
+            [{'policy': r.name, 'policy_id': r.policy_id, 'ok': r.ok, 'error': r.error} for r in results],
+            use_container_width=True,
+        )
+
+def definition_trie() -> AttributeTrie:
+    """The attribute trie of the current draft, rebuilt only when the draft changes"""
+    snapshot = st.session_state['draft_history'].current
+    cached = st.session_state.get('definition_trie')
+    if cached is None or cached[0] is not snapshot:
+        rules = {**snapshot.definition.to_dict(), **snapshot.overrides.to_dict()}
+        cached = (snapshot, AttributeTrie(rules))
+        st.session_state['definition_trie'] = cached
+    return cached[1]
+
+def governing_rules_hint(attribute_name: str):
+    """Point out rules already in the draft that also apply to the attribute being edited"""
+    trie = definition_trie()
+    others = [path for path in trie.governing(attribute_name) if path != attribute_name]
+    if '*' in attribute_name:
+        others += trie.governed(attribute_name)
+    if others:
+        st.caption('Also governed by ' + ', '.join(f'`{path}`' for path in sorted(set(others))))
+
+@st.dialog('Promote Policy', width='large')
+def promote_policy_dialog():
+    editing_policy = st.session_state['editing_policy']
+    st.write(
+        f'Create or update **{editing_policy.name}**, as last saved in this workspace, '
+        'in each target workspace. Targets are matched by policy name.'
+    )
+    targets = st.multiselect('Target Workspaces', options=list_profiles(), key='promote_targets')
+    max_workers = st.number_input('Concurrent Targets', min_value=1, max_value=32, value=DEFAULT_MAX_TARGETS)
+    if st.button('Promote', type='primary', use_container_width=True, disabled=not targets):
+        catalogs = load_workspace_catalogs(targets)
+        clients = {profile: workspace_profile_client(profile) for profile in targets}
+        with st.spinner('Promoting policy...'):
+            results = promote_policy(editing_policy, clients, catalogs, max_workers=max_workers)
+        st.session_state['workspace_cache_cursor'] += 1
+        st.dataframe(
+            [
+                {'workspace': r.workspace, 'ok': r.ok, 'created': r.created, 'policy_id': r.policy_id, 'error': r.error}
+                for r in results
+            ],
+            use_container_width=True,
+        )
+
+@st.dialog('Family Changes', width='large')
+def family_changes_dialog():
+    cache = family_cache()
+    changes = [c for c in (cache.last_change(f) for f in load_policy_families()) if c]
+    st.write(
+        'Policy families are maintained by Databricks. These families changed since their previous version, '
+        'which changes the effective definition of every policy built on them.'
+    )
+    for change in changes:
+        st.write(f'- **{change.name}**: `{change.previous_version[:8]}` → `{change.version[:8]}`')
+
+    # The listed catalog already carries every policy's overrides, so nothing is fetched per policy.
+    report = reevaluate_policies(list_cluster_policies(st.session_state['cache_cursor']), changes, cache)
+    if not report:
+        st.success('No overrides became redundant, conflicting or newly effective.', icon=':material/check_circle:')
+        return
+    st.dataframe(
+        [
+            {
+                'policy': r.policy_name, 'attribute': r.attribute, 'status': r.status,
+                'override': canonical_json(r.override),
+                'previous family rule': canonical_json(r.previous_rule) if r.previous_rule else None,
+                'family rule': canonical_json(r.rule) if r.rule else None,
+            }
+            for r in report
+        ],
+        use_container_width=True,
+        hide_index=True,
+    )
+
+@st.cache_resource(max_entries=2, show_spinner='Reading usage...')
+def load_usage_upload(file_id: str, _upload) -> 'simulate.UsageColumns':
+    """Usage columns of an uploaded file, read once per upload rather than on every rerun"""
+    return simulate.load_usage(_upload, file_name=_upload.name)
+
+@st.dialog('Simulate Cost', width='large')
+def simulate_cost_dialog():
+    st.write(
+        'Project what historical cluster usage would have cost under this draft. Upload a CSV or Parquet file '
+        f"with the columns {', '.join(f'`{c}`' for c in simulate.REQUIRED_COLUMNS)}, and optionally "
+        f"{', '.join(f'`{c}`' for c in simulate.OPTIONAL_COLUMNS)}. Nothing is sent to the workspace."
+    )
+    upload = st.file_uploader('Usage', type=['csv', 'parquet'], key='simulate_usage')
+    price_per_dbu = st.number_input(
+        'Price per DBU', min_value=0.0, value=simulate.DEFAULT_PRICE_PER_DBU, step=0.05, format='%.2f',
+        help='Used for rows without a `price_per_dbu` column',
+    )
+    if upload is None:
+        return
+    definition = {**st.session_state['definition'], **st.session_state['overrides']}
+    try:
+        usage = load_usage_upload(upload.file_id, upload)
+        rows = simulate.simulate(usage, definition, price_per_dbu=price_per_dbu)
+    except ValueError as e:
+        st.error(str(e), icon=':material/error:')
+        return
+    cost = sum(r['cost'] for r in rows)
+    projected_cost = sum(r['projected cost'] for r in rows)
+    metric_cols = st.columns(3)
+    metric_cols[0].metric('Rows', f'{len(usage):,}')
+    metric_cols[1].metric('Cost', f'{cost:,.2f}')
+    metric_cols[2].metric(
+        'Projected Cost', f'{projected_cost:,.2f}', delta=f'{projected_cost - cost:,.2f}', delta_color='inverse',
+    )
+    st.dataframe(rows, use_container_width=True, hide_index=True)
+
+@st.dialog('Compare Workspaces', width='large')
+def compare_workspaces_dialog():
+    st.write('Compare same-named policies across workspaces, against the copy in this workspace.')
+    profiles = st.multiselect('Workspaces', options=list_profiles(), default=list_profiles(), key='compare_profiles')
+    drifted_only = st.toggle('Only policies that differ', key='compare_drifted_only')
+    if st.button('Reload Catalogs', icon=':material/refresh:'):
+        st.session_state['workspace_cache_cursor'] += 1
+        st.session_state['cache_cursor'] += 1
+
+    rows = drift_matrix(load_workspace_catalogs(profiles))
+    if drifted_only:
+        rows = [row for row in rows if any(v != 'same' for k, v in row.items() if k not in ('policy', CURRENT_WORKSPACE))]
+    st.dataframe(rows, use_container_width=True, hide_index=True)
+
+@st.fragment
 def editor_ui_container():
     st.write('#### :material/tune: Edit Attribute')
     st.selectbox(
@@ -290,6 +816,9 @@ def editor_ui_container():
     # Render the corresponding UI input elements based on which attribute is selected
     if st.session_state.get('attribute_name_select'):
         supported_attributes[st.session_state['attribute_name_select']]()
+        governing_rules_hint(
+            st.session_state.get('override_attribute_name_select') or st.session_state['attribute_name_select']
+        )
 
     st.button(
         'Add to Policy',
@@ -298,19 +827,98 @@ def editor_ui_container():
         disabled=not st.session_state.get('attribute_name_select') or not st.session_state.get('inputs'),
         help='Add the current attribute to the policy definition',
     )
+    dispatch_events()
+
+@st.fragment
+def version_history_container():
+    editing_policy = st.session_state.get('editing_policy')
+    if not editing_policy:
+        return
+    versions = version_store().list_versions(editing_policy.policy_id)
+    with st.expander(f':material/history: Version History ({len(versions)})'):
+        if not versions:
+            st.write('No versions of this policy have been saved from this app yet.')
+        for i, version in enumerate(versions):
+            cols = st.columns([0.75, 0.25], vertical_alignment='center')
+            with cols[0]:
+                st.write(f'**{version.name}** · {version.kind} · {version.recorded_at[:19]} UTC')
+            with cols[1]:
+                st.button(
+                    'Roll back',
+                    key=f'rollback_version_{i}',
+                    on_click=rollback_policy,
+                    args=(version,),
+                    use_container_width=True,
+                    help='Restore the policy in the workspace to this version',
+                )
+    dispatch_events()
+
+def policy_permissions_container():
+    editing_policy = st.session_state.get('editing_policy')
+    if not editing_policy:
+        return
+    index = policy_permission_index()
+    grants = index.grants(editing_policy.policy_id)
+    error = index.errors.get(editing_policy.policy_id)
+    if grants is None and not error:
+        index.lookup_in_background(editing_policy.policy_id)
+        st.session_state['permissions_polling'] = True
+    elif st.session_state.pop('permissions_polling', False):
+        # The polling interval is set on the full run, so only a full run can stop it.
+        st.rerun()
+    with st.expander(f':material/lock_person: Permissions ({len(grants) if grants is not None else "..."})'):
+        if error:
+            st.caption(f':material/error: Could not look up permissions: {error}')
+        elif grants is None:
+            st.caption(':material/sync: Looking up permissions...')
+        elif not grants:
+            st.write('Only workspace admins can use this policy.')
+        else:
+            st.dataframe(
+                [
+                    {'principal': principal_label(g.principal), 'permission': g.permission_level, 'inherited': g.inherited}
+                    for g in grants
+                ],
+                use_container_width=True,
+                hide_index=True,
+            )
 
+@st.fragment
 def preview_policy_container():
     st.write('#### :material/draft: Policy Preview')
+    history = st.session_state['draft_history']
+    if len(history.snapshots) > 1:
+        st.session_state['history_select'] = history.cursor
+        st.selectbox(
+            'History',
+            options=range(len(history.snapshots)),
+            key='history_select',
+            on_change=jump_to_edit,
+            format_func=lambda i: f'{i}. {history.snapshots[i].label}',
+            help='Jump to any earlier or later version of this draft',
+        )
+    # Every edit commits a new snapshot, and unchanged parts of a draft keep their map, so the
+    # maps tell whether the preview changed without serializing the draft on every rerun.
+    snapshot = history.current
     if st.session_state['overrides']:
         st.write('###### Overrides')
-        st.json(st.session_state['overrides'], expanded=True)
+        render_definition(st.session_state['overrides'], key='preview_overrides', expanded=True, version=snapshot.overrides)
         st.write('###### Family Definition')
-        st.json(st.session_state['definition'], expanded=False)
+        render_definition(
+            st.session_state['definition'], key='preview_definition', expanded=False, version=snapshot.definition,
+        )
     else:
-        st.json(st.session_state['definition'], expanded=True)
+        render_definition(st.session_state['definition'], key='preview_definition', expanded=True, version=snapshot.definition)
+
+    draft = {**st.session_state['definition'], **st.session_state['overrides']}
+    draft_findings = lint_engine().lint_definition(draft) if draft else ()
+    if draft_findings:
+        with st.expander(f':material/warning: Governance Issues ({len(draft_findings)})'):
+            st.write('\n'.join(f'- {f.message}' for f in draft_findings))
+    dispatch_events()
 
 st.title('Databricks Cluster Policy Builder')
-top_buttons = st.columns(5)
+top_buttons = st.columns(6)
 with top_buttons[0]:
     st.link_button(
         'Open Workspace',
@@ -339,6 +947,35 @@ with top_buttons[2]:
         disabled=not st.session_state.get('editing_policy') or not st.session_state.get('definition'),
         on_click=clone_policy,
     )
+with top_buttons[3]:
+    st.button(
+        'Undo',
+        type='secondary',
+        use_container_width=True,
+        help='Undo the last change to the policy',
+        icon=':material/undo:',
+        disabled=not st.session_state['draft_history'].can_undo(),
+        on_click=undo_edit,
+    )
+with top_buttons[4]:
+    st.button(
+        'Redo',
+        type='secondary',
+        use_container_width=True,
+        help='Redo the last undone change to the policy',
+        icon=':material/redo:',
+        disabled=not st.session_state['draft_history'].can_redo(),
+        on_click=redo_edit,
+    )
+with top_buttons[5]:
+    st.button(
+        'Patch Policies',
+        on_click=fleet_patch_dialog,
+        use_container_width=True,
+        type='secondary',
+        help='Change one attribute across many policies at once',
+        icon=':material/published_with_changes:',
+    )
 
 # Top-level policy inputs
 policy_cols = st.columns([0.3, 0.7])
@@ -374,25 +1011,93 @@ with policy_cols[1]:
         format_func=lambda x: family_option_labels[x],
     )
 
-# Sidebar
-with st.sidebar:
+def sidebar_container():
     st.write('# :material/list: Cluster Policies')
     st.write('Select a policy to load its definition into the editor.')
     search_query = st_keyup("Policy Name/ID", placeholder="Type to search...", debounce=200)
 
-    if st.button(
+    unsaved_drafts = [
+        d for d in draft_store().list_drafts(current_user()) if d.draft_id != st.session_state['draft_id']
+    ]
+    if unsaved_drafts:
+        with st.expander(f':material/edit_note: Unsaved Drafts ({len(unsaved_drafts)})'):
+            for draft in unsaved_drafts:
+                draft_cols = st.columns([0.8, 0.2], vertical_alignment='center')
+                with draft_cols[0]:
+                    st.button(
+                        draft.label,
+                        key=f'restore_draft_{draft.draft_id}',
+                        on_click=restore_draft,
+                        args=(draft,),
+                        use_container_width=True,
+                        help=f'Last edited {draft.updated_at[:19]} UTC. Your current draft is kept.',
+                    )
+                with draft_cols[1]:
+                    st.button(
+                        ':material/delete:',
+                        key=f'discard_draft_{draft.draft_id}',
+                        on_click=discard_draft,
+                        args=(draft.draft_id,),
+                        use_container_width=True,
+                        help='Discard this draft',
+                    )
+
+    refresh = st.button(
         'Refresh',
         use_container_width=True,
         type='primary',
         help='Refresh the list of policies from the workspace',
         icon=':material/refresh:',
-    ):
+    )
+    if refresh:
+        # Only the policy list depends on the cursor, so this fragment run is enough.
         st.session_state['cache_cursor'] += 1
-        st.rerun()
+        policy_usage_tracker().refresh_in_background(force=True)
 
     with st.spinner('Loading policies...'):
         policies = list_cluster_policies(st.session_state['cache_cursor'])
 
+    # Permissions are looked up a bounded number of policies at a time, in the background.
+    permission_index = policy_permission_index()
+    permission_index.refresh_in_background((p.policy_id for p in policies), force=refresh)
+
+    # Usage counts come from a background scan of clusters and jobs, never from per-policy calls.
+    tracker = policy_usage_tracker()
+    tracker.refresh_in_background()
+    usage = tracker.usage()
+    # Until the first scan finishes every policy looks unused, which is no basis for deleting one.
+    usage_counted = tracker.last_refreshed is not None
+    if usage_counted and st.session_state.pop('usage_polling', False):
+        # The polling interval is set on the full run, so only a full run can stop it.
+        st.rerun()
+    findings = lint_engine().lint(policies)
+    sort_by = st.selectbox(
+        'Sort By', options=['Name', 'Most Used', 'Least Used'], key='policy_sort_by', disabled=not usage_counted,
+    )
+    filter_cols = st.columns(2)
+    with filter_cols[0]:
+        unused_only = st.toggle(
+            'Unused', key='policy_unused_only', disabled=not usage_counted,
+            help='Only show policies no cluster or job uses',
+        )
+    with filter_cols[1]:
+        failing_only = st.toggle('Lint Issues', key='policy_failing_only', help='Only show policies that break a governance rule')
+    usable_by = st.selectbox(
+        'Usable By',
+        options=permission_index.principals(),
+        key='policy_usable_by',
+        index=None,
+        placeholder='Anyone',
+        format_func=principal_label,
+        help='Only show policies a user, group or service principal has permissions on',
+    )
+    if tracker.refreshing:
+        st.caption(':material/sync: Counting policy usage...')
+    elif tracker.error:
+        st.caption(f':material/error: Could not count policy usage: {tracker.error}')
+    if permission_index.pending:
+        st.caption(f':material/sync: Looking up permissions of {permission_index.pending} policies...')
+
     # Filter policies based on search query
     if search_query:
         search_query = search_query.lower()
@@ -400,32 +1105,118 @@ with st.sidebar:
             policy for policy in policies
             if search_query in policy.name.lower() or search_query in policy.policy_id.lower()
         ]
-    
+    if unused_only and usage_counted:
+        policies = [policy for policy in policies if policy.policy_id not in usage]
+    if failing_only:
+        policies = [policy for policy in policies if findings[policy.policy_id]]
+    if usable_by:
+        usable_policy_ids = permission_index.policies_for(usable_by)
+        policies = [policy for policy in policies if policy.policy_id in usable_policy_ids]
+    if sort_by != 'Name' and usage_counted:
+        policies = sorted(
+            policies,
+            key=lambda p: usage.get(p.policy_id, PolicyUsage()).total,
+            reverse=sort_by == 'Most Used',
+        )
+
     for policy in policies:
+        policy_usage = usage.get(policy.policy_id, PolicyUsage())
+        policy_findings = findings[policy.policy_id]
+        if usage_counted:
+            label = f'{policy.name} · {policy_usage.total}'
+            help_text = f'Used by {policy_usage.clusters} clusters and {policy_usage.jobs} jobs'
+        else:
+            label, help_text = policy.name, 'Counting how many clusters and jobs use this policy...'
+        if policy_findings:
+            help_text += '\n\n' + '\n'.join(f'- {f.message}' for f in policy_findings)
         st.button(
-            policy.name,
+            label,
+            key=f'load_policy_{policy.policy_id}',
             on_click=load_policy,
             args=(policy,),
             use_container_width=True,
+            icon=':material/warning:' if policy_findings else None,
+            help=help_text,
         )
+    dispatch_events()
+
+# Sidebar
+with st.sidebar:
+    # Poll while the first usage scan runs, so counts appear without waiting for an interaction.
+    usage_polling = policy_usage_tracker().last_refreshed is None
+    if usage_polling:
+        policy_usage_tracker().refresh_in_background()
+        st.session_state['usage_polling'] = True
+    st.fragment(sidebar_container, run_every='1s' if usage_polling else None)()
 
 main_col1, main_col2 = st.columns([0.6, 0.4], gap='small')
 with main_col1:
     with st.container(border=True):
         editor_ui_container()
 
-    if st.button(
-        'Save Policy',
-        type='primary',
-        use_container_width=False,
-        disabled=not st.session_state.get('definition'),
-        help='Save the current policy definition to the workspace',
-    ):
-        create_policy_dialog()
+    action_cols = st.columns(5)
+    with action_cols[0]:
+        if st.button(
+            'Save Policy',
+            type='primary',
+            use_container_width=True,
+            disabled=not st.session_state.get('definition'),
+            help='Save the current policy definition to the workspace',
+        ):
+            create_policy_dialog()
+    with action_cols[1]:
+        st.button(
+            'Promote',
+            on_click=promote_policy_dialog,
+            use_container_width=True,
+            disabled=not st.session_state.get('editing_policy') or not list_profiles(),
+            help='Copy the saved policy to other workspaces from your Databricks CLI profiles',
+            icon=':material/upload:',
+        )
+    with action_cols[2]:
+        st.button(
+            'Compare Workspaces',
+            on_click=compare_workspaces_dialog,
+            use_container_width=True,
+            disabled=not list_profiles(),
+            help='Show which policies differ between workspaces',
+            icon=':material/compare_arrows:',
+        )
+    with action_cols[3]:
+        changed_families = [f for f in load_policy_families() if family_cache().last_change(f)]
+        st.button(
+            f'Family Changes ({len(changed_families)})',
+            on_click=family_changes_dialog,
+            use_container_width=True,
+            disabled=not changed_families,
+            help='Show how changes to policy families affect the overrides of policies built on them',
+            icon=':material/family_history:',
+        )
+    with action_cols[4]:
+        st.button(
+            'Simulate Cost',
+            on_click=simulate_cost_dialog,
+            use_container_width=True,
+            disabled=not st.session_state.get('definition') and not st.session_state.get('overrides'),
+            help='Project the cost of historical cluster usage under this draft',
+            icon=':material/savings:',
+        )
+
+    version_history_container()
+    # Poll for the permissions of the policy in the editor while they are looked up, instead of waiting for them.
+    editing_policy_id = st.session_state['editing_policy'].policy_id if st.session_state.get('editing_policy') else None
+    permissions_loading = bool(editing_policy_id) and (
+        policy_permission_index().grants(editing_policy_id) is None
+        and editing_policy_id not in policy_permission_index().errors
+    )
+    st.fragment(policy_permissions_container, run_every='1s' if permissions_loading else None)()
 
 with main_col2:
     with st.container(border=False):
         preview_policy_container()
 
+autosave_draft()
+startup_profile.finish('render')
+
 # Show the session state for debugging
 # st.json(st.session_state)
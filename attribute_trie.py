@@ -0,0 +1,103 @@
+from typing import Iterator
+
+WILDCARD = '*'
+# Keys of these attributes are free-form and may themselves contain dots, e.g. `spark_conf.spark.executor.memory`.
+MAP_ATTRIBUTES = ('spark_conf', 'spark_env_vars', 'custom_tags')
+
+
+def split_path(path: str) -> tuple[str, ...]:
+    """Split an attribute path into segments, keeping map keys like `spark.executor.memory` whole"""
+    root, dot, rest = path.partition('.')
+    if root in MAP_ATTRIBUTES and dot:
+        return root, rest
+    return tuple(path.split('.'))
+
+def path_matches(pattern: str, path: str) -> bool:
+    """Whether a concrete path is governed by a (possibly wildcard) attribute path"""
+    pattern_segments = split_path(pattern)
+    path_segments = split_path(path)
+    return len(pattern_segments) == len(path_segments) and all(
+        p == WILDCARD or p == s for p, s in zip(pattern_segments, path_segments)
+    )
+
+
+class _Node:
+    __slots__ = ('children', 'wildcard', 'path', 'constraint')
+
+    def __init__(self):
+        self.children: dict[str, _Node] = {}
+        self.wildcard: _Node | None = None
+        # Set on nodes where a rule of the definition ends.
+        self.path: str | None = None
+        self.constraint: dict | None = None
+
+
+class AttributeTrie:
+    """Rules of a policy definition keyed by path segment, with wildcard (`*`) nodes.
+
+    Looking up the rules that govern a concrete path, such as `init_scripts.3.s3.destination`,
+    only follows the literal and wildcard branches along the path instead of scanning every rule.
+    """
+
+    def __init__(self, definition: dict | None = None):
+        self._root = _Node()
+        for path, constraint in (definition or {}).items():
+            self.insert(path, constraint)
+
+    def insert(self, path: str, constraint: dict):
+        node = self._root
+        for segment in split_path(path):
+            if segment == WILDCARD:
+                if node.wildcard is None:
+                    node.wildcard = _Node()
+                node = node.wildcard
+            else:
+                node = node.children.setdefault(segment, _Node())
+        node.path = path
+        node.constraint = constraint
+
+    def get(self, path: str) -> dict | None:
+        """The rule stored at exactly `path`, wildcards matched literally"""
+        node = self._root
+        for segment in split_path(path):
+            node = node.wildcard if segment == WILDCARD else node.children.get(segment)
+            if node is None:
+                return None
+        return node.constraint
+
+    def governing(self, path: str) -> dict[str, dict]:
+        """The rules that apply to `path`, exact match and wildcard rules alike"""
+        segments = split_path(path)
+        found = {}
+
+        def _walk(node: _Node, depth: int):
+            if depth == len(segments):
+                if node.path is not None:
+                    found[node.path] = node.constraint
+                return
+            child = node.children.get(segments[depth])
+            if child is not None:
+                _walk(child, depth + 1)
+            if node.wildcard is not None:
+                _walk(node.wildcard, depth + 1)
+
+        _walk(self._root, 0)
+        return found
+
+    def governed(self, pattern: str) -> list[str]:
+        """The concrete (wildcard-free) rule paths that a wildcard path also applies to"""
+        segments = split_path(pattern)
+
+        def _walk(node: _Node, depth: int) -> Iterator[str]:
+            if depth == len(segments):
+                # Only literal branches are followed, so every rule found here is concrete.
+                if node.path is not None:
+                    yield node.path
+                return
+            if segments[depth] == WILDCARD:
+                for child in node.children.values():
+                    yield from _walk(child, depth + 1)
+            elif segments[depth] in node.children:
+                yield from _walk(node.children[segments[depth]], depth + 1)
+
+        return sorted(_walk(self._root, 0))
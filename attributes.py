@@ -3,6 +3,12 @@ from databricks.sdk.environments import Cloud
 from typing import Callable, Any
 from collections import OrderedDict
 
+from runtimes import RuntimeCatalog, allowlist_to_regex
+from startup import lazy_import
+
+# Testing patterns needs multiprocessing, so regex_tester is only loaded once a pattern is entered.
+regex_tester = lazy_import('regex_tester')
+
 # ===== Attribute Logic Helpers =====
 
 def set_toggle_options(attribute_name: str):
@@ -94,6 +100,50 @@ def _attribute_type(attribute_name: str, default_value_input: Callable[[], Any]
             st.session_state['inputs'].pop('hidden')
     return attribute_type
 
+def _regex_corpus(attribute_name: str) -> tuple[tuple[str, ...], str]:
+    """The known values an attribute's regex should be tested against, and where they came from"""
+    if attribute_name == 'spark_version':
+        return tuple(st.session_state['spark_versions']), 'available spark versions'
+    if attribute_name in ('node_type_id', 'driver_node_type_id'):
+        return tuple(st.session_state['load_node_types']()), 'node types'
+    if attribute_name == 'aws_attributes.zone_id':
+        return tuple(st.session_state['load_zones']()), 'zones'
+    if attribute_name in ('instance_pool_id', 'driver_instance_pool_id'):
+        return tuple(st.session_state['load_instance_pools']()), 'instance pools'
+    if attribute_name == 'aws_attributes.instance_profile_arn':
+        return tuple(st.session_state['load_instance_profiles']()), 'instance profiles'
+    return st.session_state['load_cluster_attribute_values'](attribute_name), 'values on existing clusters'
+
+def regex_pattern_input(attribute_name: str):
+    pattern = st.text_input('Regex Pattern', placeholder='^...$', key=f'{attribute_name}__pattern')
+    st.session_state['inputs']['pattern'] = pattern
+    if not pattern:
+        return
+
+    corpus, corpus_name = _regex_corpus(attribute_name)
+    result = regex_tester.evaluate_pattern(pattern, corpus)
+    if result.error:
+        st.error(f'Invalid pattern: {result.error}', icon=':material/error:')
+    elif result.timed_out:
+        st.warning(
+            'Testing this pattern timed out. It likely backtracks catastrophically on some values.',
+            icon=':material/timer_off:',
+        )
+    elif not corpus:
+        st.caption(f'No {corpus_name} to test the pattern against.')
+    else:
+        st.caption(
+            f'Matches **{len(result.matches)}** of {len(corpus)} {corpus_name}, '
+            f'rejects **{len(result.non_matches)}**. Patterns must match the whole value.'
+        )
+        cols = st.columns(2)
+        with cols[0]:
+            with st.expander(f'Matches ({len(result.matches)})'):
+                st.write('\n'.join(f'- `{v}`' for v in result.matches[:100]))
+        with cols[1]:
+            with st.expander(f'Rejected ({len(result.non_matches)})'):
+                st.write('\n'.join(f'- `{v}`' for v in result.non_matches[:100]))
+
 def gen_number_attribute_ui(attribute_name: str, _min_value: int, _max_value: int, _default_value: int):
     def _default_value_input():
         return st.number_input(
@@ -172,8 +222,7 @@ def gen_string_attribute_ui(attribute_name: str,
             fixed_value = st.text_input('Fixed Value', placeholder=_placeholder)
         st.session_state['inputs']['value'] = fixed_value
     elif at == 'regex':
-        regex_input = st.text_input('Regex Pattern', placeholder='^...$')
-        st.session_state['inputs']['pattern'] = regex_input
+        regex_pattern_input(attribute_name)
 
 def gen_boolean_attribute_ui(attribute_name: str, default_value: bool = False):
     at = _attribute_type(
@@ -238,24 +287,26 @@ def spark_version():
     # If the selection type is `allowlist` or `blocklist`, we need to allow the user to add multiple values
     if st.session_state['inputs']['type'] in ('allowlist', 'blocklist'):
         st.subheader(st.session_state['inputs']['type'].title() + ' Values')
-        # TODO: replace data_editor with a better UI for adding multiple values
-        values = st.data_editor(
-            data=[
-                {"spark_version": special_options[0]},
-            ],
-            num_rows='dynamic',
+        spark_version_filter(st.session_state['runtime_catalog'])
+        values = st.multiselect(
+            'Values',
+            options=list(spark_versions),
             key='spark_version__values',
-            column_config={
-                'spark_version': st.column_config.TextColumn(required=True),                    
-            },
-            hide_index=True,
-            width=200,
+            format_func=lambda x: spark_versions[x],
         )
-        st.session_state['inputs']['values'] = [row['spark_version'] for row in values]
+        st.session_state['inputs']['values'] = values
+
+        # Long allowlists of runtimes are usually much shorter as a single regex.
+        if st.session_state['inputs']['type'] == 'allowlist' and values:
+            if st.toggle('Compile to Regex', key='spark_version__compile_regex', help='Store the allowlist as the equivalent `regex` constraint'):
+                pattern = allowlist_to_regex(values)
+                st.code(pattern, language=None)
+                st.session_state['inputs']['type'] = 'regex'
+                st.session_state['inputs']['pattern'] = pattern
+                st.session_state['inputs'].pop('values')
     elif st.session_state['inputs']['type'] == 'regex':
         st.subheader('Regex')
-        regex_input = st.text_input('Regex Pattern', placeholder='^...$')
-        st.session_state['inputs']['pattern'] = regex_input
+        regex_pattern_input('spark_version')
     elif st.session_state['inputs']['type'] == 'fixed':
         fixed_value = st.selectbox(
             'Fixed Value',
@@ -266,6 +317,49 @@ def spark_version():
         )
         st.session_state['inputs']['value'] = fixed_value
 
+def _runtime_flag_label(flag: str) -> str:
+    return {'lts': 'LTS', 'ml': 'ML', 'gpu': 'GPU', 'photon': 'Photon'}[flag]
+
+def spark_version_filter(catalog: RuntimeCatalog):
+    def _select_matching(keys: list[str]):
+        selected = st.session_state.get('spark_version__values') or []
+        st.session_state['spark_version__values'] = selected + [k for k in keys if k not in selected]
+
+    versions = catalog.versions()
+    cols = st.columns(3)
+    with cols[0]:
+        min_version = st.selectbox(
+            'Min Version',
+            options=versions,
+            index=None,
+            key='spark_version__min_version',
+            format_func=lambda v: f'{v[0]}.{v[1]}',
+        )
+    with cols[1]:
+        require = st.pills(
+            'Require',
+            options=RuntimeCatalog.FLAGS,
+            selection_mode='multi',
+            key='spark_version__require',
+            format_func=_runtime_flag_label,
+        )
+    with cols[2]:
+        exclude = st.pills(
+            'Exclude',
+            options=RuntimeCatalog.FLAGS,
+            selection_mode='multi',
+            key='spark_version__exclude',
+            format_func=_runtime_flag_label,
+        )
+    matching = catalog.filter(min_version=min_version, require=tuple(require), exclude=tuple(exclude))
+    st.button(
+        f'Add {len(matching)} Matching Runtimes',
+        key='spark_version__select_matching',
+        on_click=_select_matching,
+        args=([r.key for r in matching],),
+        disabled=not matching,
+    )
+
 def autoscale_min_workers():
     gen_number_attribute_ui(
         attribute_name='autoscale.min_workers',
@@ -341,7 +435,7 @@ def aws_attributes_first_on_demand():
 
 def aws_attributes_instance_profile_arn():
     set_attribute_description('The ARN of the instance profile to use for the cluster.')
-    options = st.session_state['instance_profiles']
+    options = st.session_state['load_instance_profiles']()
     gen_string_attribute_ui(
         attribute_name='aws_attributes.instance_profile_arn',
         _options=options,
@@ -359,7 +453,7 @@ def aws_attributes_spot_bid_price_percent():
 
 def aws_attributes_zone_id():
     set_attribute_description('The AWS zone ID to use for the cluster.')
-    options = st.session_state['zones']
+    options = st.session_state['load_zones']()
     gen_string_attribute_ui(
         attribute_name='aws_attributes.zone_id',
         _options=options,
@@ -450,7 +544,7 @@ def docker_image_url():
 
 def driver_node_type_id():
     set_attribute_description('The node type of the driver.')
-    options = st.session_state['node_types']
+    options = st.session_state['load_node_types']()
     gen_string_attribute_ui(
         attribute_name='driver_node_type_id',
         _options=options,
@@ -459,7 +553,7 @@ def driver_node_type_id():
 
 def node_type_id():
     set_attribute_description('The node type of the worker.')
-    options = st.session_state['node_types']
+    options = st.session_state['load_node_types']()
     gen_string_attribute_ui(
         attribute_name='node_type_id',
         _options=options,
@@ -472,12 +566,13 @@ def instance_pool_id():
         or for all cluster nodes otherwise. If you use pools for worker nodes, you must also
         use pools for the driver node. When hidden, removes pool selection from the UI.
     ''')
-    options = list(st.session_state['instance_pools'].keys())
+    instance_pools = st.session_state['load_instance_pools']()
+    options = list(instance_pools.keys())
     gen_string_attribute_ui(
         attribute_name='instance_pool_id',
         _options=options,
         _placeholder=options[0] if options else '...',
-        _format_func=lambda x: f"{st.session_state['instance_pools'][x]} ({x})",
+        _format_func=lambda x: f"{instance_pools[x]} ({x})",
     )
 
 def num_workers():
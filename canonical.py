@@ -0,0 +1,83 @@
+import hashlib
+import json
+from typing import TYPE_CHECKING, Any
+
+from attribute_trie import WILDCARD, split_path
+
+if TYPE_CHECKING:
+    from databricks.sdk.service.compute import Policy
+
+# orjson parses several times faster than the standard library, but is optional. It is never used to
+# serialize: it writes floats differently (`1e16`, not `1e+16`), and hashes of the output are stored on disk.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def loads(s: str | bytes) -> Any:
+    return orjson.loads(s) if orjson else json.loads(s)
+
+def _segment_key(segment: str) -> tuple:
+    # Wildcards sort before the indices they cover, and indices sort numerically (2 before 10).
+    if segment == WILDCARD:
+        return (0, 0, '')
+    if segment.isdigit():
+        return (1, int(segment), '')
+    return (2, 0, segment)
+
+def attribute_sort_key(attribute_name: str) -> tuple:
+    return tuple(_segment_key(segment) for segment in split_path(attribute_name))
+
+def _normalize(value: Any, sort_key=None) -> Any:
+    if isinstance(value, bool) or value is None or isinstance(value, str):
+        return value
+    if isinstance(value, float):
+        # `120.0` and `120` mean the same to a policy, as does `-0.0` and `0`.
+        return int(value) if value.is_integer() else value
+    if isinstance(value, int):
+        return value
+    if isinstance(value, dict):
+        return {k: _normalize(value[k]) for k in sorted(value, key=sort_key)}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    raise TypeError(f'Cannot canonicalize {type(value).__name__}')
+
+def canonicalize(definition: Any) -> Any:
+    """Equivalent definition with normalized numbers and attributes in canonical order.
+
+    Attributes are ordered by path segment, so wildcard and indexed rules such as
+    `init_scripts.*.s3.destination` and `init_scripts.10.s3.destination` always appear
+    in the same order. Keys inside each rule are sorted alphabetically.
+    """
+    return _normalize(definition, sort_key=attribute_sort_key)
+
+def canonical_json(definition: Any) -> str:
+    """Compact, canonical serialization: equivalent definitions always serialize to the same string"""
+    return json.dumps(canonicalize(definition), separators=(',', ':'), ensure_ascii=False)
+
+def text_hash(text: str) -> str:
+    """Hash of a string, e.g. a canonical serialization that was already computed"""
+    return hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+
+def content_hash(definition: Any) -> str:
+    """Stable hash of a definition's canonical serialization, for caches, dedup and change detection"""
+    return text_hash(canonical_json(definition))
+
+def policy_content(policy: 'Policy') -> dict:
+    """Everything saving a policy writes, in canonical form, so copies of a policy compare by content hash.
+
+    Empty and missing names and descriptions are the same. The definition of a family policy
+    includes the family's own rules, so only its overrides are compared.
+    """
+    content = {
+        'name': policy.name or None,
+        'description': policy.description or None,
+        'max_clusters_per_user': policy.max_clusters_per_user,
+        'policy_family_id': policy.policy_family_id,
+    }
+    if policy.policy_family_id:
+        content['overrides'] = loads(policy.policy_family_definition_overrides or '{}')
+    else:
+        content['definition'] = loads(policy.definition or '{}')
+    return canonicalize(content)
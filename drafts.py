@@ -0,0 +1,144 @@
+import atexit
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from canonical import canonical_json, content_hash, loads
+from storage import write_atomic
+
+DEFAULT_DRAFT_STORE_DIR = os.environ.get('POLICY_DRAFT_STORE_DIR', '.policy_drafts')
+# Writes wait for this long a pause in editing, but never longer than the max delay.
+DEFAULT_DEBOUNCE_SECONDS = 2.0
+DEFAULT_MAX_DELAY_SECONDS = 10.0
+
+
+@dataclass(frozen=True)
+class Draft:
+    """An unsaved policy as it is in the editor"""
+    draft_id: str
+    updated_at: str
+    name: str | None
+    description: str | None
+    max_clusters_per_user: int | None
+    policy_family_id: str | None
+    # `Policy.as_dict()` of the policy being edited, if any
+    editing_policy: dict | None
+    definition: dict
+    overrides: dict
+
+    @property
+    def label(self) -> str:
+        attributes = len(self.overrides if self.policy_family_id else self.definition)
+        return f"{self.name or 'Untitled policy'} · {attributes} attributes"
+
+
+class DraftStore:
+    """Local store of each user's unsaved drafts, one JSON file per draft.
+
+    Layout under `root`:
+      <user hash>/<draft_id>.json
+
+    `save` only queues the draft. A background writer coalesces every save of the same
+    draft into one write, once the draft hasn't changed for `debounce_seconds` (or after
+    `max_delay_seconds` of continuous editing), and skips drafts identical to what is on disk.
+    """
+
+    def __init__(self, root: str | Path = DEFAULT_DRAFT_STORE_DIR, debounce_seconds: float = DEFAULT_DEBOUNCE_SECONDS,
+                 max_delay_seconds: float = DEFAULT_MAX_DELAY_SECONDS):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.debounce_seconds = debounce_seconds
+        self.max_delay_seconds = max_delay_seconds
+        self._condition = threading.Condition()
+        # (user, draft_id) -> (draft, due, deadline)
+        self._pending: dict[tuple[str, str], tuple[Draft, float, float]] = {}
+        self._written: dict[tuple[str, str], str] = {}
+        self._writer: threading.Thread | None = None
+        atexit.register(self.flush)
+
+    def _user_dir(self, user: str) -> Path:
+        # Emails don't make safe or private directory names.
+        return self.root / content_hash(user)
+
+    def _draft_path(self, user: str, draft_id: str) -> Path:
+        return self._user_dir(user) / f'{draft_id}.json'
+
+    # ===== Reads =====
+
+    def list_drafts(self, user: str) -> list[Draft]:
+        """The user's drafts, including ones not written yet, most recently updated first"""
+        drafts = {}
+        user_dir = self._user_dir(user)
+        if user_dir.exists():
+            for path in user_dir.glob('*.json'):
+                try:
+                    draft = Draft(**loads(path.read_bytes()))
+                except (OSError, ValueError, TypeError):
+                    continue
+                drafts[draft.draft_id] = draft
+        with self._condition:
+            for (pending_user, draft_id), (draft, _, _) in self._pending.items():
+                if pending_user == user:
+                    drafts[draft_id] = draft
+        return sorted(drafts.values(), key=lambda d: d.updated_at, reverse=True)
+
+    # ===== Writes =====
+
+    def save(self, user: str, draft: Draft):
+        """Queue the latest state of a draft to be written"""
+        key = (user, draft.draft_id)
+        now = time.monotonic()
+        with self._condition:
+            deadline = self._pending[key][2] if key in self._pending else now + self.max_delay_seconds
+            self._pending[key] = (draft, min(now + self.debounce_seconds, deadline), deadline)
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_pending, daemon=True)
+                self._writer.start()
+            self._condition.notify()
+
+    def discard(self, user: str, draft_id: str):
+        """Forget a draft, e.g. once it has been saved to the workspace"""
+        key = (user, draft_id)
+        with self._condition:
+            self._pending.pop(key, None)
+            self._written.pop(key, None)
+            self._draft_path(user, draft_id).unlink(missing_ok=True)
+
+    def flush(self):
+        """Write every pending draft now"""
+        with self._condition:
+            for key, (draft, _, _) in list(self._pending.items()):
+                self._write(key, draft)
+            self._pending.clear()
+
+    def _write(self, key: tuple[str, str], draft: Draft):
+        # Callers hold the lock, so a draft can't be discarded halfway through being written.
+        body = canonical_json(asdict(draft))
+        body_hash = content_hash({**asdict(draft), 'updated_at': None})
+        if self._written.get(key) == body_hash:
+            return
+        path = self._draft_path(*key)
+        path.parent.mkdir(exist_ok=True)
+        write_atomic(path, body)
+        self._written[key] = body_hash
+
+    def _write_pending(self):
+        with self._condition:
+            while True:
+                if not self._pending:
+                    self._condition.wait()
+                    continue
+                now = time.monotonic()
+                due = [key for key, (_, due_at, _) in self._pending.items() if due_at <= now]
+                if not due:
+                    self._condition.wait(min(due_at for _, due_at, _ in self._pending.values()) - now)
+                    continue
+                for key in due:
+                    draft, _, _ = self._pending.pop(key)
+                    try:
+                        self._write(key, draft)
+                    except OSError:
+                        # Keep editing; the next save of this draft tries again.
+                        pass
@@ -0,0 +1,164 @@
+"""Detect drift between policies kept as code and the live workspace.
+
+Desired state is a directory of JSON files, one per policy:
+
+    {
+      "name": "Shared Compute",
+      "description": "...",
+      "max_clusters_per_user": 2,
+      "definition": {"autotermination_minutes": {"type": "range", "maxValue": 120}}
+    }
+
+Family-based policies set `policy_family_id` and `policy_family_definition_overrides`
+instead of `definition`. Run with `python drift.py <directory>`; the exit code is 1 when
+anything drifted, so it can run on a schedule from cron or a Databricks job.
+"""
+import argparse
+import json
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from databricks.sdk import WorkspaceClient
+from databricks.sdk.service.compute import Policy
+
+from canonical import canonical_json, content_hash, loads, policy_content
+
+
+@dataclass(frozen=True)
+class DesiredPolicy:
+    name: str
+    source: Path
+    definition: dict = field(default_factory=dict)
+    overrides: dict = field(default_factory=dict)
+    policy_family_id: str | None = None
+    description: str | None = None
+    max_clusters_per_user: int | None = None
+
+
+@dataclass(frozen=True)
+class AttributeDrift:
+    attribute: str
+    desired: object
+    live: object
+
+
+@dataclass(frozen=True)
+class PolicyDrift:
+    name: str
+    # `missing` from the workspace, `drifted` from the desired state, or `unmanaged` by it
+    status: str
+    policy_id: str | None = None
+    attributes: tuple[AttributeDrift, ...] = ()
+
+
+def load_desired_state(directory: str | Path) -> dict[str, DesiredPolicy]:
+    desired = {}
+    for path in sorted(Path(directory).glob('*.json')):
+        body = loads(path.read_text())
+        desired[body['name']] = DesiredPolicy(
+            name=body['name'],
+            source=path,
+            definition=body.get('definition', {}),
+            overrides=body.get('policy_family_definition_overrides', {}),
+            policy_family_id=body.get('policy_family_id'),
+            description=body.get('description'),
+            max_clusters_per_user=body.get('max_clusters_per_user'),
+        )
+    return desired
+
+def desired_content(policy: DesiredPolicy) -> dict:
+    return policy_content(Policy(
+        name=policy.name,
+        description=policy.description,
+        max_clusters_per_user=policy.max_clusters_per_user,
+        policy_family_id=policy.policy_family_id,
+        definition=canonical_json(policy.definition),
+        policy_family_definition_overrides=canonical_json(policy.overrides),
+    ))
+
+def live_content(policy: Policy) -> dict:
+    return policy_content(policy)
+
+def attribute_drift(desired: dict, live: dict) -> list[AttributeDrift]:
+    """Per-attribute differences between desired and live content"""
+    flat_desired = _flatten_content(desired)
+    flat_live = _flatten_content(live)
+    return [
+        AttributeDrift(attribute, flat_desired.get(attribute), flat_live.get(attribute))
+        for attribute in sorted(flat_desired.keys() | flat_live.keys())
+        if flat_desired.get(attribute) != flat_live.get(attribute)
+    ]
+
+def _flatten_content(content: dict) -> dict:
+    # Rules are compared whole, e.g. `definition.autotermination_minutes`, not field by field.
+    flat = {}
+    for key, value in content.items():
+        if key in ('definition', 'overrides'):
+            flat.update({f'{key}.{attribute}': rule for attribute, rule in value.items()})
+        else:
+            flat[key] = value
+    return flat
+
+def detect_drift(w: WorkspaceClient, desired: dict[str, DesiredPolicy],
+                 include_unmanaged: bool = False) -> list[PolicyDrift]:
+    """Compare desired and live policies by content hash, diffing attributes only where the hashes differ"""
+    live = {p.name: p for p in w.cluster_policies.list() if not p.is_default}
+    desired_hashes = {name: content_hash(desired_content(p)) for name, p in desired.items()}
+
+    drifts = []
+    for name, desired_policy in desired.items():
+        live_policy = live.get(name)
+        if live_policy is None:
+            drifts.append(PolicyDrift(name, 'missing'))
+            continue
+        live_body = live_content(live_policy)
+        if content_hash(live_body) == desired_hashes[name]:
+            continue
+        # The listing already carries full definitions, so mismatches are diffed without fetching them again.
+        attributes = attribute_drift(desired_content(desired_policy), live_body)
+        if attributes:
+            drifts.append(PolicyDrift(name, 'drifted', live_policy.policy_id, tuple(attributes)))
+    if include_unmanaged:
+        drifts += [PolicyDrift(name, 'unmanaged', p.policy_id) for name, p in sorted(live.items()) if name not in desired]
+    return drifts
+
+def format_report(drifts: list[PolicyDrift]) -> str:
+    if not drifts:
+        return 'No drift.'
+    lines = []
+    for drift in drifts:
+        lines.append(f'{drift.status.upper():10} {drift.name}' + (f' ({drift.policy_id})' if drift.policy_id else ''))
+        for attribute in drift.attributes:
+            lines.append(f'    {attribute.attribute}: desired {json.dumps(attribute.desired)}, live {json.dumps(attribute.live)}')
+    return '\n'.join(lines)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description='Report drift between policies kept as code and a workspace.')
+    parser.add_argument('directory', help='Directory of desired policy JSON files')
+    parser.add_argument('--profile', help='Databricks CLI profile of the workspace to check')
+    parser.add_argument('--include-unmanaged', action='store_true', help='Also report live policies with no desired file')
+    parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+    parser.add_argument('--interval', type=int, help='Check again every INTERVAL seconds instead of exiting')
+    args = parser.parse_args(argv)
+
+    w = WorkspaceClient(profile=args.profile)
+    while True:
+        drifts = detect_drift(w, load_desired_state(args.directory), include_unmanaged=args.include_unmanaged)
+        if args.json:
+            print(json.dumps([
+                {'name': d.name, 'status': d.status, 'policy_id': d.policy_id,
+                 'attributes': [vars(a) for a in d.attributes]}
+                for d in drifts
+            ], indent=2))
+        else:
+            print(format_report(drifts))
+        if not args.interval:
+            return 1 if drifts else 0
+        time.sleep(args.interval)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,174 @@
+"""Export every cluster policy in a workspace as infrastructure as code.
+
+    python export.py policies/ --format terraform
+    python export.py bundle/ --format bundle --profile prod
+
+`terraform` writes one `databricks_cluster_policy` resource per policy. Bundles can't
+manage cluster policies themselves, so `bundle` writes one `cluster_policy` lookup
+variable per policy, for jobs and clusters in the bundle to reference by name.
+
+Output is deterministic, and files whose content hash hasn't changed since the last export
+are not rewritten, so re-exporting only touches policies that changed.
+"""
+import argparse
+import json
+import re
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable
+
+from databricks.sdk import WorkspaceClient
+from databricks.sdk.service.compute import Policy
+
+from canonical import canonicalize, content_hash, loads
+from storage import write_atomic
+
+FORMATS = ('terraform', 'bundle')
+MANIFEST_NAME = '.export-hashes'
+
+
+@dataclass
+class ExportSummary:
+    written: int = 0
+    unchanged: int = 0
+    removed: int = 0
+
+
+def resource_name(policy: Policy) -> str:
+    """Terraform resource or bundle variable name for a policy, derived from its name"""
+    name = re.sub(r'[^a-z0-9]+', '_', (policy.name or '').lower()).strip('_') or 'policy'
+    return f'policy_{name}' if name[0].isdigit() else name
+
+def _hcl_string(value: str) -> str:
+    # JSON string escapes are valid HCL, but `${` and `%{` would start a template.
+    return json.dumps(value).replace('${', '$${').replace('%{', '%%{')
+
+def _hcl_json(value: dict) -> str:
+    # Attributes keep their canonical order, so re-exports only differ where the policy did.
+    body = json.dumps(canonicalize(value), indent=2, ensure_ascii=False)
+    body = body.replace('${', '$${').replace('%{', '%%{')
+    return body.replace('\n', '\n  ')
+
+def _hcl_block(block_type: str, body: dict, indent: str = '  ') -> list[str]:
+    # Nested objects, such as the `pypi` of a library, are blocks of their own.
+    lines = [f'{indent}{block_type} {{']
+    for key, value in sorted(body.items()):
+        if isinstance(value, dict):
+            lines += _hcl_block(key, value, indent + '  ')
+        elif isinstance(value, list):
+            lines.append(f"{indent}  {key} = [{', '.join(_hcl_string(v) for v in value)}]")
+        else:
+            lines.append(f'{indent}  {key} = {_hcl_string(value)}')
+    lines.append(f'{indent}}}')
+    return lines
+
+def terraform_resource(policy: Policy, name: str) -> str:
+    lines = [f'resource "databricks_cluster_policy" "{name}" {{', f'  name = {_hcl_string(policy.name)}']
+    if policy.description:
+        lines.append(f'  description = {_hcl_string(policy.description)}')
+    if policy.max_clusters_per_user:
+        lines.append(f'  max_clusters_per_user = {policy.max_clusters_per_user}')
+    # The definition of a family policy includes the family's rules, so only its overrides are exported.
+    if policy.policy_family_id:
+        lines.append(f'  policy_family_id = {_hcl_string(policy.policy_family_id)}')
+        overrides = loads(policy.policy_family_definition_overrides or '{}')
+        lines.append(f'  policy_family_definition_overrides = jsonencode({_hcl_json(overrides)})')
+    else:
+        lines.append(f'  definition = jsonencode({_hcl_json(loads(policy.definition or "{}"))})')
+    # Applying a resource without the policy's libraries would remove them, so they are exported too.
+    for library in policy.libraries or []:
+        lines += _hcl_block('libraries', library.as_dict())
+    lines.append('}')
+    return '\n'.join(lines) + '\n'
+
+def bundle_variable(policy: Policy, name: str) -> str:
+    # JSON strings are valid double-quoted YAML scalars.
+    return '\n'.join([
+        'variables:',
+        f'  {name}_policy_id:',
+        f'    description: {json.dumps(f"Cluster policy {policy.name}")}',
+        '    lookup:',
+        f'      cluster_policy: {json.dumps(policy.name)}',
+    ]) + '\n'
+
+def _render(policy: Policy, name: str, format: str) -> tuple[str, str]:
+    if format == 'terraform':
+        return f'{name}.tf', terraform_resource(policy, name)
+    return f'{name}.yml', bundle_variable(policy, name)
+
+
+# ===== Export =====
+
+def _read_manifest(directory: Path) -> dict[str, str]:
+    path = directory / MANIFEST_NAME
+    if not path.exists():
+        return {}
+    manifest = {}
+    for line in path.read_text().splitlines():
+        digest, _, filename = line.partition('  ')
+        manifest[filename] = digest
+    return manifest
+
+def export_policies(policies: Iterable[Policy], directory: str | Path, format: str = 'terraform',
+                    prune: bool = False) -> ExportSummary:
+    """Write one file per policy.
+
+    The policy listing endpoint isn't paged, so memory is bounded by the size of its one
+    response rather than by this function. A manifest of content hashes in the output
+    directory tells which files are unchanged since the last export, so they are neither
+    written nor read back.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    previous = _read_manifest(directory)
+    manifest = {}
+    names = set()
+    summary = ExportSummary()
+    # Built-in policies are managed by Databricks and can't be created as code.
+    named = sorted(
+        ((resource_name(policy), policy) for policy in policies if not policy.is_default),
+        key=lambda item: (item[0], item[1].policy_id),
+    )
+    for name, policy in named:
+        # Policy names are unique, but two may still normalize to the same resource name. Sorting by
+        # policy id first means the same policy keeps the plain name whatever order they are listed in.
+        if name in names:
+            name = f'{name}_{policy.policy_id.lower()}'
+        names.add(name)
+        filename, body = _render(policy, name, format)
+        digest = content_hash(body)
+        manifest[filename] = digest
+        if previous.get(filename) == digest and (directory / filename).exists():
+            summary.unchanged += 1
+            continue
+        write_atomic(directory / filename, body)
+        summary.written += 1
+
+    if prune:
+        for filename in previous.keys() - manifest.keys():
+            (directory / filename).unlink(missing_ok=True)
+            summary.removed += 1
+    else:
+        # Keep tracking files of policies that are gone, so a later `--prune` still removes them.
+        manifest = {**{f: d for f, d in previous.items() if (directory / f).exists()}, **manifest}
+    write_atomic(directory / MANIFEST_NAME, ''.join(f'{manifest[f]}  {f}\n' for f in sorted(manifest)))
+    return summary
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description='Export every cluster policy in a workspace as code.')
+    parser.add_argument('directory', help='Directory to write one file per policy to')
+    parser.add_argument('--format', choices=FORMATS, default='terraform', help='Output format (default: terraform)')
+    parser.add_argument('--profile', help='Databricks CLI profile of the workspace to export')
+    parser.add_argument('--prune', action='store_true', help='Remove files of policies no longer in the workspace')
+    args = parser.parse_args(argv)
+
+    w = WorkspaceClient(profile=args.profile)
+    summary = export_policies(w.cluster_policies.list(), args.directory, format=args.format, prune=args.prune)
+    print(f'{summary.written} written, {summary.unchanged} unchanged, {summary.removed} removed.')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,130 @@
+import os
+from dataclasses import dataclass
+from pathlib import Path
+
+from databricks.sdk.service.compute import Policy, PolicyFamily
+
+from canonical import canonical_json, canonicalize, content_hash, loads
+
+DEFAULT_FAMILY_CACHE_DIR = os.environ.get('POLICY_FAMILY_CACHE_DIR', '.policy_families')
+
+# How an override relates to its family after the family changed, see `override_status`.
+REDUNDANT = 'redundant'
+CONFLICTING = 'conflicting'
+NEWLY_EFFECTIVE = 'newly effective'
+
+
+@dataclass(frozen=True)
+class FamilyChange:
+    policy_family_id: str
+    name: str | None
+    previous_version: str
+    version: str
+
+
+@dataclass(frozen=True)
+class OverrideChange:
+    policy_id: str
+    policy_name: str
+    policy_family_id: str
+    attribute: str
+    status: str
+    override: dict
+    previous_rule: dict | None
+    rule: dict | None
+
+
+class FamilyDefinitionCache:
+    """Local cache of policy family definitions by family id and version.
+
+    Family listings carry no version number, so a version is the content hash of the
+    family's definition. Layout under `root`:
+      <family_id>/<version>.json   the canonical definition of each version seen
+      <family_id>/HISTORY          one version per line, in the order they were seen
+    """
+
+    def __init__(self, root: str | Path = DEFAULT_FAMILY_CACHE_DIR):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._definitions: dict[tuple[str, str], dict] = {}
+
+    def _family_dir(self, policy_family_id: str) -> Path:
+        return self.root / policy_family_id
+
+    def history(self, policy_family_id: str) -> list[str]:
+        path = self._family_dir(policy_family_id) / 'HISTORY'
+        if not path.exists():
+            return []
+        return path.read_text().split()
+
+    def get(self, policy_family_id: str, version: str) -> dict:
+        key = (policy_family_id, version)
+        if key not in self._definitions:
+            self._definitions[key] = loads((self._family_dir(policy_family_id) / f'{version}.json').read_bytes())
+        return self._definitions[key]
+
+    def update(self, families: list[PolicyFamily]) -> list[FamilyChange]:
+        """Record the listed definition of every family, returning the families that changed since they were last seen"""
+        changes = []
+        for family in families:
+            definition = loads(family.definition or '{}')
+            version = content_hash(definition)
+            history = self.history(family.policy_family_id)
+            if history and history[-1] == version:
+                continue
+            family_dir = self._family_dir(family.policy_family_id)
+            family_dir.mkdir(exist_ok=True)
+            (family_dir / f'{version}.json').write_text(canonical_json(definition))
+            with open(family_dir / 'HISTORY', 'a') as f:
+                f.write(version + '\n')
+            self._definitions[(family.policy_family_id, version)] = definition
+            if history:
+                changes.append(FamilyChange(family.policy_family_id, family.name, history[-1], version))
+        return changes
+
+    def last_change(self, family: PolicyFamily) -> FamilyChange | None:
+        """The most recent change of a family's definition, if it ever changed"""
+        history = self.history(family.policy_family_id)
+        if len(history) < 2:
+            return None
+        return FamilyChange(family.policy_family_id, family.name, history[-2], history[-1])
+
+
+# ===== Re-evaluation =====
+
+def override_status(override: dict, previous_rule: dict | None, rule: dict | None) -> str | None:
+    """How a change of the family rule from `previous_rule` to `rule` affects an override of it.
+
+    - redundant: the override used to change the family rule, but now equals it
+    - newly effective: the override used to equal the family rule, but now keeps the previous rule in place
+    - conflicting: the family changed a rule the override replaces, so the family's update never applies
+    """
+    was_equal = override == previous_rule
+    is_equal = override == rule
+    if is_equal and not was_equal:
+        return REDUNDANT
+    if was_equal and not is_equal:
+        return NEWLY_EFFECTIVE
+    if not is_equal and previous_rule != rule:
+        return CONFLICTING
+    return None
+
+def reevaluate_policies(policies: list[Policy], changes: list[FamilyChange],
+                        cache: FamilyDefinitionCache) -> list[OverrideChange]:
+    """Re-resolve every policy built on a changed family, from the listed catalog and cached family versions"""
+    changes_by_family = {change.policy_family_id: change for change in changes}
+    report = []
+    for policy in policies:
+        change = changes_by_family.get(policy.policy_family_id)
+        if change is None or not policy.policy_family_definition_overrides:
+            continue
+        previous = cache.get(change.policy_family_id, change.previous_version)
+        current = cache.get(change.policy_family_id, change.version)
+        for attribute, override in canonicalize(loads(policy.policy_family_definition_overrides)).items():
+            status = override_status(override, previous.get(attribute), current.get(attribute))
+            if status:
+                report.append(OverrideChange(
+                    policy.policy_id, policy.name, policy.policy_family_id, attribute, status,
+                    override, previous.get(attribute), current.get(attribute),
+                ))
+    return report
@@ -0,0 +1,127 @@
+import re
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, replace
+
+from databricks.sdk import WorkspaceClient
+from databricks.sdk.service.compute import Policy
+
+from canonical import canonical_json, loads
+from workspaces import DEFAULT_MAX_REQUESTS
+
+
+@dataclass(frozen=True)
+class PolicySelector:
+    """Selects policies from the catalog. Unset criteria match every policy."""
+    name_pattern: str | None = None
+    exclude_name_pattern: str | None = None
+    policy_family_id: str | None = None
+    has_attribute: str | None = None
+
+    def matches(self, policy: Policy, definition: dict) -> bool:
+        if self.name_pattern and not re.search(self.name_pattern, policy.name or '', re.IGNORECASE):
+            return False
+        if self.exclude_name_pattern and re.search(self.exclude_name_pattern, policy.name or '', re.IGNORECASE):
+            return False
+        if self.policy_family_id and policy.policy_family_id != self.policy_family_id:
+            return False
+        if self.has_attribute and self.has_attribute not in definition:
+            return False
+        return True
+
+
+@dataclass(frozen=True)
+class PolicyPatch:
+    """A planned change of one attribute in one policy"""
+    policy: Policy
+    attribute_path: str
+    before: dict | None
+    after: dict
+    # Family policies are patched through their overrides, everything else through the definition.
+    document: dict
+
+    @property
+    def is_override(self) -> bool:
+        return bool(self.policy.policy_family_id)
+
+    def patched_policy(self) -> Policy:
+        if self.is_override:
+            # The definition of a family policy is its effective definition, so it changes with the overrides.
+            definition = {**loads(self.policy.definition or '{}'), self.attribute_path: self.after}
+            return replace(
+                self.policy,
+                definition=canonical_json(definition),
+                policy_family_definition_overrides=canonical_json(self.document),
+            )
+        return replace(self.policy, definition=canonical_json(self.document))
+
+
+@dataclass(frozen=True)
+class PatchResult:
+    policy_id: str
+    name: str
+    ok: bool
+    error: str | None = None
+
+
+def plan_patch(policies: list[Policy], attribute_path: str, constraint: dict,
+               selector: PolicySelector) -> list[PolicyPatch]:
+    """Compute the patched documents of every selected policy, skipping policies that already comply"""
+    patches = []
+    for policy in policies:
+        # Built-in policies can't be edited.
+        if policy.is_default:
+            continue
+        definition = loads(policy.definition or '{}')
+        if not selector.matches(policy, definition):
+            continue
+        if definition.get(attribute_path) == constraint:
+            continue
+        if policy.policy_family_id:
+            document = loads(policy.policy_family_definition_overrides or '{}')
+        else:
+            document = definition
+        patches.append(PolicyPatch(
+            policy=policy,
+            attribute_path=attribute_path,
+            before=definition.get(attribute_path),
+            after=constraint,
+            document={**document, attribute_path: constraint},
+        ))
+    return patches
+
+def summarize_patches(patches: list[PolicyPatch]) -> list[dict]:
+    """Aggregate diff: how many policies go from each distinct previous constraint to the new one"""
+    counts = Counter(canonical_json(p.before) for p in patches)
+    after = canonical_json(patches[0].after) if patches else None
+    return [
+        {'before': before, 'after': after, 'policies': count}
+        for before, count in counts.most_common()
+    ]
+
+def _apply_patch(w: WorkspaceClient, patch: PolicyPatch) -> PatchResult:
+    policy = patch.patched_policy()
+    request_args = {
+        'policy_id': policy.policy_id,
+        'name': policy.name,
+        'description': policy.description,
+        'max_clusters_per_user': policy.max_clusters_per_user,
+        'libraries': policy.libraries,
+    }
+    if patch.is_override:
+        request_args['policy_family_id'] = policy.policy_family_id
+        request_args['policy_family_definition_overrides'] = policy.policy_family_definition_overrides
+    else:
+        request_args['definition'] = policy.definition
+    try:
+        w.cluster_policies.edit(**request_args)
+    except Exception as e:
+        return PatchResult(policy.policy_id, policy.name, ok=False, error=str(e))
+    return PatchResult(policy.policy_id, policy.name, ok=True)
+
+def apply_patches(w: WorkspaceClient, patches: list[PolicyPatch],
+                  max_workers: int = DEFAULT_MAX_REQUESTS) -> list[PatchResult]:
+    """Write the patched policies with at most `max_workers` concurrent requests"""
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(_apply_patch, w, patch) for patch in patches]
+        return [future.result() for future in as_completed(futures)]
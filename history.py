@@ -0,0 +1,164 @@
+from dataclasses import dataclass
+from typing import Any, Iterator
+
+# ===== Persistent Map =====
+
+# Hash array mapped trie: every node is a small dict of up to 32 slots. Setting a key
+# copies only the nodes on the path to it (~log32(n) small dicts) and shares the rest,
+# so snapshots of a definition cost memory proportional to what changed between them.
+_BITS = 5
+_MASK = (1 << _BITS) - 1
+_HASH_MASK = (1 << 64) - 1
+# Past this depth all 64 hash bits are used up, so nodes become plain key -> value buckets.
+_MAX_DEPTH = 13
+
+
+@dataclass(frozen=True, slots=True)
+class _Leaf:
+    key: str
+    value: Any
+
+
+def _hash(key: str) -> int:
+    return hash(key) & _HASH_MASK
+
+def _get(node: dict, h: int, depth: int, key: str, default: Any) -> Any:
+    while depth < _MAX_DEPTH:
+        entry = node.get((h >> (depth * _BITS)) & _MASK)
+        if entry is None:
+            return default
+        if isinstance(entry, _Leaf):
+            return entry.value if entry.key == key else default
+        node, depth = entry, depth + 1
+    return node.get(key, default)
+
+def _set(node: dict, h: int, depth: int, key: str, value: Any) -> tuple[dict, bool]:
+    """Return a copy of `node` with the key set, and whether the key is new"""
+    new_node = dict(node)
+    if depth == _MAX_DEPTH:
+        new_node[key] = value
+        return new_node, key not in node
+
+    slot = (h >> (depth * _BITS)) & _MASK
+    entry = node.get(slot)
+    if entry is None:
+        new_node[slot] = _Leaf(key, value)
+        return new_node, True
+    if isinstance(entry, _Leaf):
+        if entry.key == key:
+            new_node[slot] = _Leaf(key, value)
+            return new_node, False
+        # Two keys share this slot, push both down a level.
+        child, _ = _set({}, _hash(entry.key), depth + 1, entry.key, entry.value)
+        new_node[slot], _ = _set(child, h, depth + 1, key, value)
+        return new_node, True
+    new_node[slot], added = _set(entry, h, depth + 1, key, value)
+    return new_node, added
+
+def _items(node: dict, depth: int) -> Iterator[tuple[str, Any]]:
+    if depth == _MAX_DEPTH:
+        yield from node.items()
+        return
+    for entry in node.values():
+        if isinstance(entry, _Leaf):
+            yield entry.key, entry.value
+        else:
+            yield from _items(entry, depth + 1)
+
+
+class PersistentMap:
+    """An immutable attribute name -> value mapping that shares structure between versions"""
+
+    __slots__ = ('_root', '_size')
+
+    def __init__(self, root: dict | None = None, size: int = 0):
+        self._root = root if root is not None else {}
+        self._size = size
+
+    @classmethod
+    def from_dict(cls, values: dict) -> 'PersistentMap':
+        result = cls()
+        for key, value in values.items():
+            result = result.set(key, value)
+        return result
+
+    def set(self, key: str, value: Any) -> 'PersistentMap':
+        root, added = _set(self._root, _hash(key), 0, key, value)
+        return PersistentMap(root, self._size + added)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return _get(self._root, _hash(key), 0, key, default)
+
+    def items(self) -> Iterator[tuple[str, Any]]:
+        return _items(self._root, 0)
+
+    def to_dict(self) -> dict:
+        return dict(self.items())
+
+    def __contains__(self, key: str) -> bool:
+        sentinel = object()
+        return self.get(key, sentinel) is not sentinel
+
+    def __len__(self) -> int:
+        return self._size
+
+
+# ===== Draft History =====
+
+@dataclass(frozen=True, slots=True)
+class Snapshot:
+    """One point in the draft's history"""
+    label: str
+    definition: PersistentMap
+    overrides: PersistentMap
+
+
+class DraftHistory:
+    """Linear undo/redo timeline of immutable draft snapshots.
+
+    Committing after an undo discards the redo tail, like any editor. Moving to any
+    point in the timeline only moves a cursor.
+    """
+
+    def __init__(self, label: str, definition: dict, overrides: dict):
+        self.snapshots = [Snapshot(label, PersistentMap.from_dict(definition), PersistentMap.from_dict(overrides))]
+        self.cursor = 0
+
+    @property
+    def current(self) -> Snapshot:
+        return self.snapshots[self.cursor]
+
+    def set_attribute(self, label: str, attribute_name: str, value: Any, override: bool = False) -> Snapshot:
+        current = self.current
+        if override:
+            snapshot = Snapshot(label, current.definition, current.overrides.set(attribute_name, value))
+        else:
+            snapshot = Snapshot(label, current.definition.set(attribute_name, value), current.overrides)
+        return self.commit(snapshot)
+
+    def replace(self, label: str, definition: dict, overrides: dict) -> Snapshot:
+        return self.commit(Snapshot(label, PersistentMap.from_dict(definition), PersistentMap.from_dict(overrides)))
+
+    def commit(self, snapshot: Snapshot) -> Snapshot:
+        del self.snapshots[self.cursor + 1:]
+        self.snapshots.append(snapshot)
+        self.cursor += 1
+        return snapshot
+
+    def can_undo(self) -> bool:
+        return self.cursor > 0
+
+    def can_redo(self) -> bool:
+        return self.cursor < len(self.snapshots) - 1
+
+    def jump(self, index: int) -> Snapshot:
+        if not 0 <= index < len(self.snapshots):
+            raise IndexError(f'No snapshot at index {index}, history has {len(self.snapshots)} entries')
+        self.cursor = index
+        return self.current
+
+    def undo(self) -> Snapshot:
+        return self.jump(self.cursor - 1)
+
+    def redo(self) -> Snapshot:
+        return self.jump(self.cursor + 1)
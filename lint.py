@@ -0,0 +1,157 @@
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+from databricks.sdk.service.compute import Policy
+
+from canonical import loads, text_hash
+from runtimes import RuntimeCatalog
+
+DEFAULT_CACHE_SIZE = 100_000
+
+
+@dataclass(frozen=True)
+class LintFinding:
+    rule_id: str
+    message: str
+
+
+@dataclass(frozen=True)
+class LintContext:
+    """Workspace facts rules may need beyond the policy itself"""
+    runtime_catalog: RuntimeCatalog | None = None
+
+
+@dataclass(frozen=True)
+class LintRule:
+    """A governance rule. `check` gets the constraint of each path in `reads` (None when unset)
+    and returns a message when the policy breaks the rule."""
+    id: str
+    description: str
+    reads: tuple[str, ...]
+    check: Callable[..., str | None] = field(compare=False)
+
+
+RULES: list[LintRule] = []
+
+def lint_rule(id: str, description: str, reads: tuple[str, ...]):
+    """Register a rule with the default rule set"""
+    def _register(check: Callable[..., str | None]):
+        RULES.append(LintRule(id, description, reads, check))
+        return check
+    return _register
+
+
+# ===== Built-in Rules =====
+
+@lint_rule('bounded-dbus', '`dbus_per_hour` must have an upper bound', reads=('dbus_per_hour',))
+def _bounded_dbus(context: LintContext, dbus_per_hour: dict | None) -> str | None:
+    if dbus_per_hour is None:
+        return '`dbus_per_hour` is not limited'
+    if dbus_per_hour.get('type') == 'fixed' or (dbus_per_hour.get('type') == 'range' and 'maxValue' in dbus_per_hour):
+        return None
+    return f"`dbus_per_hour` is `{dbus_per_hour.get('type')}` without a `maxValue`"
+
+_SECURE_ACCESS_MODES = {'SINGLE_USER', 'USER_ISOLATION'}
+
+@lint_rule('secure-access-mode', '`data_security_mode` must be `SINGLE_USER` or `USER_ISOLATION`', reads=('data_security_mode',))
+def _secure_access_mode(context: LintContext, data_security_mode: dict | None) -> str | None:
+    if data_security_mode is None:
+        return '`data_security_mode` is not limited'
+    constraint_type = data_security_mode.get('type')
+    if constraint_type == 'fixed' and data_security_mode.get('value') in _SECURE_ACCESS_MODES:
+        return None
+    if constraint_type == 'allowlist' and set(data_security_mode.get('values', [])) <= _SECURE_ACCESS_MODES:
+        return None
+    return '`data_security_mode` allows modes other than `SINGLE_USER` and `USER_ISOLATION`'
+
+@lint_rule('lts-runtime', '`spark_version` must not be fixed to a non-LTS runtime', reads=('spark_version',))
+def _lts_runtime(context: LintContext, spark_version: dict | None) -> str | None:
+    if spark_version is None or spark_version.get('type') != 'fixed':
+        return None
+    value = spark_version.get('value') or ''
+    if value.startswith('auto:'):
+        return None if 'lts' in value else f'`spark_version` is fixed to `{value}`, which is not an LTS runtime'
+    if context.runtime_catalog is None:
+        return None
+    runtime = context.runtime_catalog.by_key.get(value)
+    if runtime is None:
+        return f'`spark_version` is fixed to unknown runtime `{value}`'
+    return None if runtime.lts else f'`spark_version` is fixed to `{value}`, which is not an LTS runtime'
+
+@lint_rule('autotermination', '`autotermination_minutes` must not allow 0', reads=('autotermination_minutes',))
+def _autotermination(context: LintContext, autotermination_minutes: dict | None) -> str | None:
+    constraint = autotermination_minutes
+    if constraint is None:
+        return '`autotermination_minutes` is not limited, so auto termination can be turned off'
+    constraint_type = constraint.get('type')
+    if constraint_type == 'fixed' and constraint.get('value', 0) > 0:
+        return None
+    if constraint_type == 'range' and constraint.get('minValue', 0) > 0:
+        return None
+    if constraint_type == 'allowlist' and 0 not in constraint.get('values', [0]):
+        return None
+    return f'`autotermination_minutes` is `{constraint_type}` and allows 0 (no auto termination)'
+
+
+# ===== Engine =====
+
+def _raw_content_hash(policy: Policy) -> str:
+    # Hashing the listed strings as they are avoids parsing and canonicalizing every policy on every rerun.
+    return text_hash(f'{policy.definition or ""}\0{policy.policy_family_definition_overrides or ""}')
+
+def _effective_definition(policy: Policy) -> dict:
+    definition = loads(policy.definition or '{}')
+    definition.update(loads(policy.policy_family_definition_overrides or '{}'))
+    return definition
+
+
+class LintEngine:
+    """Runs every rule over a whole policy catalog in one pass.
+
+    Only the attribute paths rules declare in `reads` are extracted, into one column per
+    path across all policies, and each rule then runs down its columns. Findings are
+    cached by a hash of the raw definition and overrides, so unchanged policies are never linted twice.
+    """
+
+    def __init__(self, rules: list[LintRule] | None = None, context: LintContext | None = None,
+                 cache_size: int = DEFAULT_CACHE_SIZE):
+        self.rules = list(RULES if rules is None else rules)
+        self.context = context or LintContext()
+        self._paths = sorted({path for rule in self.rules for path in rule.reads})
+        self._cache: OrderedDict[str, tuple[LintFinding, ...]] = OrderedDict()
+        self._cache_size = cache_size
+
+    def lint_definition(self, definition: dict) -> tuple[LintFinding, ...]:
+        """Lint a single definition, e.g. the draft in the editor. Not cached."""
+        return self._lint_columns({path: [definition.get(path)] for path in self._paths}, 1)[0]
+
+    def lint(self, policies: list[Policy]) -> dict[str, tuple[LintFinding, ...]]:
+        """Findings for every policy, by policy_id"""
+        hashes = [_raw_content_hash(p) for p in policies]
+        pending = {}
+        for policy, definition_hash in zip(policies, hashes):
+            if definition_hash not in self._cache and definition_hash not in pending:
+                pending[definition_hash] = _effective_definition(policy)
+
+        if pending:
+            # Columnar view: one list per path read by any rule, one entry per pending policy.
+            columns = {path: [] for path in self._paths}
+            for definition in pending.values():
+                for path, column in columns.items():
+                    column.append(definition.get(path))
+            for definition_hash, findings in zip(pending, self._lint_columns(columns, len(pending))):
+                self._cache[definition_hash] = findings
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+
+        return {policy.policy_id: self._cache[h] for policy, h in zip(policies, hashes)}
+
+    def _lint_columns(self, columns: dict[str, list[Any]], rows: int) -> list[tuple[LintFinding, ...]]:
+        findings = [[] for _ in range(rows)]
+        for rule in self.rules:
+            for row, values in enumerate(zip(*(columns[path] for path in rule.reads))):
+                message = rule.check(self.context, *values)
+                if message:
+                    findings[row].append(LintFinding(rule.id, message))
+        return [tuple(f) for f in findings]
@@ -0,0 +1,140 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Iterable
+
+from databricks.sdk import WorkspaceClient
+from databricks.sdk.service.compute import ClusterPolicyAccessControlResponse
+
+from workspaces import DEFAULT_MAX_REQUESTS, DEFAULT_REFRESH_SECONDS
+
+
+@dataclass(frozen=True)
+class PolicyGrant:
+    # `group:<name>`, `user:<name>` or `service_principal:<name>`
+    principal: str
+    display_name: str
+    permission_level: str
+    inherited: bool
+
+
+def principal_key(acl: ClusterPolicyAccessControlResponse) -> str | None:
+    if acl.group_name:
+        return f'group:{acl.group_name}'
+    if acl.user_name:
+        return f'user:{acl.user_name}'
+    if acl.service_principal_name:
+        return f'service_principal:{acl.service_principal_name}'
+    return None
+
+def principal_label(principal: str) -> str:
+    kind, _, name = principal.partition(':')
+    return f"{name} ({kind.replace('_', ' ')})"
+
+def policy_grants(acls: list[ClusterPolicyAccessControlResponse]) -> tuple[PolicyGrant, ...]:
+    grants = []
+    for acl in acls:
+        principal = principal_key(acl)
+        if principal is None:
+            continue
+        for permission in acl.all_permissions or []:
+            grants.append(PolicyGrant(
+                principal=principal,
+                display_name=acl.display_name or principal.partition(':')[2],
+                permission_level=permission.permission_level.value if permission.permission_level else '',
+                inherited=bool(permission.inherited),
+            ))
+    return tuple(sorted(set(grants), key=lambda g: (g.principal, g.permission_level, g.inherited)))
+
+
+class PolicyPermissionIndex:
+    """Who can use each policy, looked up in the background and indexed both ways.
+
+    Lookups run on a pool of at most `max_workers` threads and are cached per policy for
+    `refresh_seconds`. Every result updates both the policy -> principals and the
+    principal -> policies index as it arrives, so readers never wait on the API.
+    """
+
+    def __init__(self, w: WorkspaceClient, refresh_seconds: float = DEFAULT_REFRESH_SECONDS,
+                 max_workers: int = DEFAULT_MAX_REQUESTS):
+        self._w = w
+        self._refresh_seconds = refresh_seconds
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='policy-permissions')
+        self._lock = threading.Lock()
+        self._grants: dict[str, tuple[PolicyGrant, ...]] = {}
+        self._fetched_at: dict[str, float] = {}
+        self._by_principal: dict[str, set[str]] = {}
+        self._queued: set[str] = set()
+        self._prioritized: set[str] = set()
+        self.errors: dict[str, str] = {}
+
+    # ===== Reads =====
+
+    def grants(self, policy_id: str) -> tuple[PolicyGrant, ...] | None:
+        """Grants on a policy, or None if it hasn't been looked up yet"""
+        with self._lock:
+            return self._grants.get(policy_id)
+
+    def policies_for(self, principal: str) -> set[str]:
+        with self._lock:
+            return set(self._by_principal.get(principal, ()))
+
+    def principals(self) -> list[str]:
+        """Every principal granted any policy, groups first"""
+        with self._lock:
+            return sorted(self._by_principal, key=lambda p: (not p.startswith('group:'), p))
+
+    @property
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._queued)
+
+    # ===== Lookups =====
+
+    def refresh_in_background(self, policy_ids: Iterable[str], force: bool = False):
+        """Queue lookups of every policy not looked up within `refresh_seconds`, unless already queued"""
+        now = time.time()
+        with self._lock:
+            stale = [
+                policy_id for policy_id in policy_ids
+                if policy_id not in self._queued
+                and (force or now - self._fetched_at.get(policy_id, 0) >= self._refresh_seconds)
+            ]
+            self._queued.update(stale)
+        for policy_id in stale:
+            self._pool.submit(self._lookup, policy_id)
+
+    def lookup_in_background(self, policy_id: str):
+        """Look up one policy now, ahead of queued lookups, e.g. the policy in the editor"""
+        with self._lock:
+            if policy_id in self._grants or policy_id in self.errors or policy_id in self._prioritized:
+                return
+            self._prioritized.add(policy_id)
+        threading.Thread(target=self._lookup, args=(policy_id,), daemon=True).start()
+
+    def _set_grants(self, policy_id: str, grants: tuple[PolicyGrant, ...]):
+        with self._lock:
+            for grant in self._grants.get(policy_id, ()):
+                principal_policies = self._by_principal.get(grant.principal)
+                if principal_policies is not None:
+                    principal_policies.discard(policy_id)
+                    if not principal_policies:
+                        del self._by_principal[grant.principal]
+            self._grants[policy_id] = grants
+            for grant in grants:
+                self._by_principal.setdefault(grant.principal, set()).add(policy_id)
+
+    def _lookup(self, policy_id: str):
+        try:
+            permissions = self._w.cluster_policies.get_permissions(policy_id)
+            self._set_grants(policy_id, policy_grants(permissions.access_control_list or []))
+            self.errors.pop(policy_id, None)
+        except Exception as e:
+            self.errors[policy_id] = str(e)
+        finally:
+            with self._lock:
+                # Failed lookups also wait for the next refresh, rather than being retried on every rerun.
+                self._fetched_at[policy_id] = time.time()
+                self._queued.discard(policy_id)
+                self._prioritized.discard(policy_id)
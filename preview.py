@@ -0,0 +1,69 @@
+import streamlit as st
+
+from attribute_trie import split_path
+from canonical import attribute_sort_key, canonical_json, text_hash
+
+# Definitions with fewer attributes than this are rendered as a single JSON block.
+INCREMENTAL_PREVIEW_MIN_ATTRIBUTES = 50
+# Only auto-expand changed sections for small edits, not when a whole policy is swapped in.
+MAX_AUTO_EXPANDED_SECTIONS = 3
+
+
+def attribute_section(attribute_name: str) -> str:
+    """The path prefix an attribute is grouped under, e.g. `spark_conf` for `spark_conf.spark.foo`"""
+    return split_path(attribute_name)[0]
+
+def group_attributes(definition: dict) -> dict[str, dict]:
+    """Group the attributes of a definition by their path prefix, sorted by prefix"""
+    sections = {}
+    for attribute_name in sorted(definition, key=attribute_sort_key):
+        sections.setdefault(attribute_section(attribute_name), {})[attribute_name] = definition[attribute_name]
+    return sections
+
+def _refresh_preview_state(definition: dict, key: str, version: object = None) -> dict:
+    """Re-serialize the sections of a definition, but only if its content changed since the last rerun.
+
+    `version` is any immutable object that is replaced whenever the definition changes, such as
+    a draft history snapshot. Reruns with the same version skip serializing the definition at all.
+    """
+    state_key = f'{key}__preview_state'
+    previous = st.session_state.get(state_key)
+    if previous and version is not None and previous['version'] is version:
+        return previous
+    serialized = canonical_json(definition)
+    definition_hash = text_hash(serialized)
+    if previous and previous['hash'] == definition_hash:
+        previous['version'] = version
+        return previous
+
+    state = {'version': version, 'hash': definition_hash, 'body': serialized, 'count': len(definition), 'sections': {}}
+    changed = []
+    if len(definition) >= INCREMENTAL_PREVIEW_MIN_ATTRIBUTES:
+        previous_sections = previous['sections'] if previous else {}
+        for section, attributes in group_attributes(definition).items():
+            body = canonical_json(attributes)
+            section_hash = text_hash(body)
+            state['sections'][section] = {'hash': section_hash, 'body': body, 'count': len(attributes)}
+            if previous_sections and previous_sections.get(section, {}).get('hash') != section_hash:
+                changed.append(section)
+
+    # Open the sections that were just edited so the change is visible without searching for it.
+    if len(changed) <= MAX_AUTO_EXPANDED_SECTIONS:
+        for section in changed:
+            st.session_state[f'{key}__{section}__expanded'] = True
+
+    st.session_state[state_key] = state
+    return state
+
+def render_definition(definition: dict, key: str, expanded: bool = True, version: object = None):
+    """Render a policy definition, sending only the expanded sections of large definitions to the browser"""
+    state = _refresh_preview_state(definition, key, version)
+    if not state['sections']:
+        st.json(state['body'], expanded=expanded)
+        return
+
+    st.caption(f"{state['count']} attributes in {len(state['sections'])} sections")
+    for section, cached in state['sections'].items():
+        label = f"`{section}` ({cached['count']})"
+        if st.toggle(label, key=f'{key}__{section}__expanded'):
+            st.json(cached['body'], expanded=expanded)
@@ -0,0 +1,125 @@
+import multiprocessing
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any
+
+from attribute_trie import AttributeTrie
+
+# Patterns that take longer than this against a corpus are most likely backtracking catastrophically.
+DEFAULT_TIMEOUT_SECONDS = 2.0
+# Sessions test patterns concurrently, each on its own worker process, up to this many at a time.
+DEFAULT_MAX_WORKERS = 4
+RESULT_CACHE_SIZE = 256
+
+_idle_pools = []
+_pools_lock = threading.Lock()
+_workers = threading.BoundedSemaphore(DEFAULT_MAX_WORKERS)
+_results: OrderedDict[tuple[str, tuple[str, ...]], 'RegexTestResult'] = OrderedDict()
+_results_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class RegexTestResult:
+    pattern: str
+    matches: tuple[str, ...] = ()
+    non_matches: tuple[str, ...] = ()
+    error: str | None = None
+    timed_out: bool = False
+
+
+@lru_cache(maxsize=256)
+def compile_pattern(pattern: str) -> re.Pattern:
+    return re.compile(pattern)
+
+def _match_corpus(pattern: str, corpus: tuple[str, ...]) -> list[bool]:
+    # Policy regexes are always anchored to the start and end of the value.
+    compiled = compile_pattern(pattern)
+    return [compiled.fullmatch(value) is not None for value in corpus]
+
+def _checkout_pool():
+    with _pools_lock:
+        if _idle_pools:
+            return _idle_pools.pop()
+    # A worker process can be killed when a pattern runs away, a thread can't.
+    pool = multiprocessing.get_context('spawn').Pool(processes=1)
+    # Starting the worker takes a while on a cold container, so wait for it before the timeout starts.
+    pool.apply(int)
+    return pool
+
+def _checkin_pool(pool):
+    with _pools_lock:
+        _idle_pools.append(pool)
+
+def _run_pattern(pattern: str, corpus: tuple[str, ...], timeout: float) -> RegexTestResult:
+    with _workers:
+        pool = _checkout_pool()
+        try:
+            matched = pool.apply_async(_match_corpus, (pattern, corpus)).get(timeout)
+        except multiprocessing.TimeoutError:
+            pool.terminate()
+            return RegexTestResult(pattern, timed_out=True)
+        _checkin_pool(pool)
+    return RegexTestResult(
+        pattern,
+        matches=tuple(v for v, m in zip(corpus, matched) if m),
+        non_matches=tuple(v for v, m in zip(corpus, matched) if not m),
+    )
+
+def evaluate_pattern(pattern: str, corpus: tuple[str, ...], timeout: float = DEFAULT_TIMEOUT_SECONDS) -> RegexTestResult:
+    """Match a pattern against every value in the corpus, giving up after `timeout` seconds"""
+    try:
+        compile_pattern(pattern)
+    except re.error as e:
+        return RegexTestResult(pattern, error=str(e))
+    if not corpus:
+        return RegexTestResult(pattern)
+
+    key = (pattern, corpus)
+    with _results_lock:
+        if key in _results:
+            _results.move_to_end(key)
+            return _results[key]
+    result = _run_pattern(pattern, corpus, timeout)
+    # A timeout may be down to a busy machine rather than the pattern, so it is tried again next time.
+    if not result.timed_out:
+        with _results_lock:
+            _results[key] = result
+            while len(_results) > RESULT_CACHE_SIZE:
+                _results.popitem(last=False)
+    return result
+
+
+# ===== Corpora =====
+
+def flatten_attributes(obj: Any, prefix: str = '') -> dict[str, Any]:
+    """Flatten a nested cluster spec into policy attribute paths, e.g. `init_scripts.0.s3.destination`"""
+    if isinstance(obj, dict):
+        items = obj.items()
+    elif isinstance(obj, list):
+        items = enumerate(obj)
+    else:
+        return {prefix: obj}
+    flattened = {}
+    for key, value in items:
+        flattened.update(flatten_attributes(value, f'{prefix}.{key}' if prefix else str(key)))
+    return flattened
+
+def attribute_index(cluster_attributes: list[dict[str, Any]]) -> AttributeTrie:
+    """Distinct string values of every concrete path across flattened cluster specs, keyed by path in a trie"""
+    values: dict[str, set[str]] = {}
+    for attributes in cluster_attributes:
+        for path, value in attributes.items():
+            if value is not None:
+                values.setdefault(path, set()).add(str(value))
+    return AttributeTrie(values)
+
+def attribute_values(index: AttributeTrie, attribute_name: str) -> tuple[str, ...]:
+    """Distinct values of an attribute (which may contain `*` wildcards) across the indexed cluster specs"""
+    values = set()
+    # Only the branches of the trie along the attribute's path are visited, not every path of every cluster.
+    for path in index.governed(attribute_name):
+        values.update(index.get(path))
+    return tuple(sorted(values))
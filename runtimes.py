@@ -0,0 +1,147 @@
+import re
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+
+# Runtime keys look like `15.4.x-scala2.12`, `15.4.x-cpu-ml-scala2.12`, `15.4.x-gpu-ml-scala2.12`,
+# `11.3.x-photon-scala2.12` or `16.1.x-aarch64-scala2.12`.
+_RUNTIME_KEY_RE = re.compile(r'^(?P<major>\d+)\.(?P<minor>\d+)\.x-(?P<variant>.*?)-?scala(?P<scala>[\d.]+)$')
+
+
+@dataclass(frozen=True)
+class SparkRuntime:
+    key: str
+    name: str
+    major: int
+    minor: int
+    scala: str
+    lts: bool
+    ml: bool
+    gpu: bool
+    photon: bool
+
+    @property
+    def version(self) -> tuple[int, int]:
+        return self.major, self.minor
+
+
+def parse_runtime(key: str, name: str) -> SparkRuntime | None:
+    """Parse a runtime key and display name, or None for keys that don't follow the usual format"""
+    match = _RUNTIME_KEY_RE.match(key)
+    if not match:
+        return None
+    variant = match['variant'].split('-')
+    return SparkRuntime(
+        key=key,
+        name=name,
+        major=int(match['major']),
+        minor=int(match['minor']),
+        scala=match['scala'],
+        lts='LTS' in name,
+        ml='ml' in variant,
+        gpu='gpu' in variant,
+        photon='photon' in variant or 'Photon' in name,
+    )
+
+
+class RuntimeCatalog:
+    """Spark runtimes parsed once and indexed by version and feature flags"""
+
+    FLAGS = ('lts', 'ml', 'gpu', 'photon')
+
+    def __init__(self, runtimes: list[SparkRuntime]):
+        self.runtimes = sorted(runtimes, key=lambda r: (r.version, r.key))
+        self.by_key = {r.key: r for r in self.runtimes}
+        self._versions = [r.version for r in self.runtimes]
+        self._flag_index = {
+            flag: frozenset(r.key for r in self.runtimes if getattr(r, flag))
+            for flag in self.FLAGS
+        }
+
+    @classmethod
+    def from_versions(cls, versions: dict[str, str]) -> 'RuntimeCatalog':
+        """Build the catalog from a `key -> name` mapping, as returned by `load_available_spark_versions`"""
+        runtimes = (parse_runtime(key, name) for key, name in versions.items())
+        return cls([r for r in runtimes if r is not None])
+
+    def versions(self) -> list[tuple[int, int]]:
+        return sorted(set(self._versions))
+
+    def filter(self, min_version: tuple[int, int] | None = None, max_version: tuple[int, int] | None = None,
+               require: tuple[str, ...] = (), exclude: tuple[str, ...] = ()) -> list[SparkRuntime]:
+        """Runtimes within the version range that have every `require` flag and none of the `exclude` flags"""
+        start = bisect_left(self._versions, min_version) if min_version else 0
+        end = bisect_right(self._versions, max_version) if max_version else len(self._versions)
+        keys = {r.key for r in self.runtimes[start:end]}
+        for flag in require:
+            keys &= self._flag_index[flag]
+        for flag in exclude:
+            keys -= self._flag_index[flag]
+        return [r for r in self.runtimes[start:end] if r.key in keys]
+
+
+# ===== Allowlist to Regex =====
+
+_REGEX_METACHARACTERS = set('.^$*+?{}[]\\|()')
+
+def _escape(char: str) -> str:
+    # Unlike `re.escape`, leaves `-` and other literal punctuation alone to keep patterns short.
+    return f'\\{char}' if char in _REGEX_METACHARACTERS else char
+
+def _trie_regex(strings: list[str]) -> str:
+    """Regex matching exactly `strings`, with common prefixes factored out"""
+    trie = {}
+    for s in strings:
+        node = trie
+        for char in s:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def _render(node: dict) -> str:
+        terminal = '' in node
+        children = [(char, _render(child)) for char, child in sorted(node.items()) if char]
+        if not children:
+            return ''
+        if len(children) == 1 and not terminal:
+            return _escape(children[0][0]) + children[0][1]
+        if len(children) == 1 and not children[0][1]:
+            group = _escape(children[0][0])
+        elif all(not rest for _, rest in children):
+            # Alternatives of single characters collapse into a character class.
+            group = '[' + ''.join(re.escape(char) for char, _ in children) + ']'
+        else:
+            group = '(?:' + '|'.join(_escape(char) + rest for char, rest in children) + ')'
+        return f'{group}?' if terminal else group
+
+    return _render(trie)
+
+def allowlist_to_regex(values: list[str]) -> str:
+    """Compile runtime keys into the shortest anchored regex we can find that matches exactly those keys.
+
+    Runtime keys share a handful of suffixes (`-scala2.12`, `-cpu-ml-scala2.12`, ...), so
+    besides factoring common prefixes, keys are grouped by suffix to factor the versions.
+    """
+    values = sorted(set(values))
+    candidates = [_trie_regex(values)]
+
+    versions_by_suffix = {}
+    unparsed = []
+    for value in values:
+        match = re.match(r'^(\d+\.\d+)(\.x-.*)$', value)
+        if match:
+            versions_by_suffix.setdefault(match[2], []).append(match[1])
+        else:
+            unparsed.append(value)
+    suffixes_by_versions = {}
+    for suffix, versions in versions_by_suffix.items():
+        suffixes_by_versions.setdefault(_trie_regex(versions), []).append(suffix)
+    # Trie regexes never alternate at the top level, so they can be concatenated as is.
+    alternatives = [
+        versions + _trie_regex(suffixes)
+        for versions, suffixes in sorted(suffixes_by_versions.items())
+    ]
+    if unparsed:
+        alternatives.append(_trie_regex(unparsed))
+    candidates.append('|'.join(alternatives))
+
+    best = min(candidates, key=len)
+    return f'^(?:{best})$' if '|' in best else f'^{best}$'
@@ -0,0 +1,224 @@
+"""What-if cost simulation of a policy against historical cluster usage, entirely offline.
+
+Usage is a CSV or Parquet file with one row per cluster per period (e.g. per hour):
+
+    team            who to report the cost under, e.g. from a `team` custom tag
+    node_type_id    worker node type
+    num_workers     number of workers running during the period
+    usage_hours     length of the period (optional, 1 hour by default)
+    dbus            DBUs consumed during the period
+    price_per_dbu   list price (optional, `--price-per-dbu` by default)
+    workload_id     cluster or job the row belongs to (optional, rows are counted otherwise)
+
+Each row is clamped to the policy's `node_type_id`, `num_workers`, `autoscale.max_workers`
+and `dbus_per_hour` constraints, and the projected DBUs and cost are reported per team:
+
+    python simulate.py usage.parquet policy.json --price-per-dbu 0.55
+"""
+import argparse
+import json
+import re
+import sys
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from canonical import loads
+
+REQUIRED_COLUMNS = ('team', 'node_type_id', 'num_workers', 'dbus')
+OPTIONAL_COLUMNS = ('usage_hours', 'price_per_dbu', 'workload_id')
+DEFAULT_PRICE_PER_DBU = 0.55
+
+
+@dataclass(frozen=True)
+class UsageColumns:
+    """Usage records as one NumPy array per column. Strings are factorized into integer codes."""
+    team_codes: np.ndarray
+    teams: np.ndarray
+    node_type_codes: np.ndarray
+    node_types: np.ndarray
+    num_workers: np.ndarray
+    usage_hours: np.ndarray
+    dbus: np.ndarray
+    price_per_dbu: np.ndarray | None
+    workload_codes: np.ndarray | None
+
+    def __len__(self) -> int:
+        return len(self.dbus)
+
+
+def load_usage(source, file_name: str | None = None) -> UsageColumns:
+    """Read a CSV or Parquet usage file, from a path or file-like object, into columnar arrays"""
+    file_name = file_name or str(source)
+    if file_name.endswith('.parquet'):
+        frame = pd.read_parquet(source)
+    else:
+        frame = pd.read_csv(source)
+    missing = [c for c in REQUIRED_COLUMNS if c not in frame.columns]
+    if missing:
+        raise ValueError(f"Usage is missing the {', '.join(missing)} column(s)")
+
+    team_codes, teams = pd.factorize(frame['team'].fillna('(untagged)').astype(str))
+    node_type_codes, node_types = pd.factorize(frame['node_type_id'].astype(str))
+    workload_codes = pd.factorize(frame['workload_id'])[0] if 'workload_id' in frame.columns else None
+    return UsageColumns(
+        team_codes=team_codes,
+        teams=np.asarray(teams),
+        node_type_codes=node_type_codes,
+        node_types=np.asarray(node_types),
+        num_workers=frame['num_workers'].fillna(0).to_numpy(dtype=np.float64),
+        usage_hours=(frame['usage_hours'] if 'usage_hours' in frame.columns else pd.Series(1.0, index=frame.index))
+            .to_numpy(dtype=np.float64),
+        dbus=frame['dbus'].to_numpy(dtype=np.float64),
+        price_per_dbu=frame['price_per_dbu'].to_numpy(dtype=np.float64) if 'price_per_dbu' in frame.columns else None,
+        workload_codes=workload_codes,
+    )
+
+
+# ===== Policy Bounds =====
+
+def _numeric_bounds(*constraints: dict | None) -> tuple[float, float]:
+    """Tightest minimum and maximum any of the constraints allows"""
+    low, high = -np.inf, np.inf
+    for constraint in constraints:
+        if not constraint:
+            continue
+        if constraint.get('type') == 'fixed':
+            low = max(low, constraint['value'])
+            high = min(high, constraint['value'])
+        elif constraint.get('type') == 'range':
+            low = max(low, constraint.get('minValue', -np.inf))
+            high = min(high, constraint.get('maxValue', np.inf))
+    return low, high
+
+def _allowed_categories(categories: np.ndarray, constraint: dict | None) -> np.ndarray:
+    """Which of the distinct values a string constraint allows. Runs once per distinct value, not per row."""
+    if not constraint:
+        return np.ones(len(categories), dtype=bool)
+    constraint_type = constraint.get('type')
+    if constraint_type == 'fixed':
+        return categories == constraint['value']
+    if constraint_type == 'allowlist':
+        return np.isin(categories, constraint.get('values', []))
+    if constraint_type == 'blocklist':
+        return ~np.isin(categories, constraint.get('values', []))
+    if constraint_type == 'regex':
+        try:
+            pattern = re.compile(constraint['pattern'])
+        except re.error as e:
+            raise ValueError(f"Pattern `{constraint['pattern']}` is not a valid regex: {e}") from e
+        return np.array([bool(pattern.fullmatch(c)) for c in categories], dtype=bool)
+    if constraint_type == 'forbidden':
+        return np.zeros(len(categories), dtype=bool)
+    return np.ones(len(categories), dtype=bool)
+
+
+# ===== Simulation =====
+
+def simulate(usage: UsageColumns, definition: dict, price_per_dbu: float = DEFAULT_PRICE_PER_DBU) -> list[dict]:
+    """Projected DBUs and cost per team if every row had run under the policy `definition`.
+
+    Rows on a node type the policy doesn't allow move to the policy's default node type, or
+    else to the allowed node type with the lowest observed DBU rate per node hour. Workers
+    are clamped to the `num_workers` and `autoscale.max_workers` bounds, and DBUs per hour
+    to the `dbus_per_hour` bound. A row is constrained if any of these changed it.
+    """
+    nodes = usage.num_workers + 1  # workers and the driver
+    node_hours = np.maximum(nodes * usage.usage_hours, 1e-9)
+    rate = usage.dbus / node_hours
+
+    # Observed DBU rate per node hour of each node type, for rows that have to change node type.
+    node_type_count = len(usage.node_types)
+    observed_rate = np.bincount(usage.node_type_codes, weights=usage.dbus, minlength=node_type_count) / np.maximum(
+        np.bincount(usage.node_type_codes, weights=node_hours, minlength=node_type_count), 1e-9
+    )
+    node_type_constraint = definition.get('node_type_id')
+    allowed = _allowed_categories(usage.node_types, node_type_constraint)
+    node_type_changed = ~allowed[usage.node_type_codes]
+    if node_type_changed.any():
+        replacement = (node_type_constraint or {}).get('defaultValue') or (node_type_constraint or {}).get('value')
+        replacement_code = np.flatnonzero(usage.node_types == replacement)
+        if len(replacement_code):
+            replacement_rate = observed_rate[replacement_code[0]]
+        elif allowed.any():
+            replacement_rate = observed_rate[allowed].min()
+        else:
+            replacement_rate = None
+        if replacement_rate is not None:
+            rate = np.where(node_type_changed, replacement_rate, rate)
+
+    low, high = _numeric_bounds(definition.get('num_workers'), definition.get('autoscale.max_workers'))
+    workers = np.clip(usage.num_workers, max(low, 0), high)
+    workers_changed = workers != usage.num_workers
+    projected = rate * (workers + 1) * usage.usage_hours
+
+    _, max_dbus_per_hour = _numeric_bounds(definition.get('dbus_per_hour'))
+    projected_capped = np.minimum(projected, max_dbus_per_hour * usage.usage_hours)
+    dbus_changed = projected_capped < projected
+    projected = projected_capped
+
+    constrained = node_type_changed | workers_changed | dbus_changed
+    prices = usage.price_per_dbu if usage.price_per_dbu is not None else np.full(len(usage), price_per_dbu)
+    return _per_team(usage, constrained, usage.dbus, projected, prices)
+
+def _per_team(usage: UsageColumns, constrained: np.ndarray, dbus: np.ndarray, projected: np.ndarray,
+              prices: np.ndarray) -> list[dict]:
+    teams = len(usage.teams)
+
+    def sums(weights: np.ndarray) -> np.ndarray:
+        return np.bincount(usage.team_codes, weights=weights, minlength=teams)
+
+    if usage.workload_codes is None:
+        workloads = np.bincount(usage.team_codes, minlength=teams)
+        constrained_workloads = np.bincount(usage.team_codes[constrained], minlength=teams)
+    else:
+        # Encode (team, workload) pairs as one integer, so a workload counts once however many rows it has.
+        base = int(usage.workload_codes.max()) + 2
+        pairs = usage.team_codes.astype(np.int64) * base + usage.workload_codes + 1
+        workloads = np.bincount(np.unique(pairs) // base, minlength=teams)
+        constrained_workloads = np.bincount(np.unique(pairs[constrained]) // base, minlength=teams)
+
+    dbus_before, dbus_after = sums(dbus), sums(projected)
+    cost_before, cost_after = sums(dbus * prices), sums(projected * prices)
+    rows = [
+        {
+            'team': str(usage.teams[i]),
+            'workloads': int(workloads[i]),
+            'constrained': int(constrained_workloads[i]),
+            'dbus': round(float(dbus_before[i]), 2),
+            'projected dbus': round(float(dbus_after[i]), 2),
+            'dbu delta': round(float(dbus_after[i] - dbus_before[i]), 2),
+            'cost': round(float(cost_before[i]), 2),
+            'projected cost': round(float(cost_after[i]), 2),
+            'cost delta': round(float(cost_after[i] - cost_before[i]), 2),
+        }
+        for i in range(teams)
+    ]
+    # Biggest savings first
+    return sorted(rows, key=lambda row: row['cost delta'])
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description='Project the cost of historical cluster usage under a policy.')
+    parser.add_argument('usage', help='CSV or Parquet file of usage records')
+    parser.add_argument('policy', help='JSON file of the policy definition')
+    parser.add_argument('--price-per-dbu', type=float, default=DEFAULT_PRICE_PER_DBU,
+                        help=f'Price of a DBU for rows without a price_per_dbu (default: {DEFAULT_PRICE_PER_DBU})')
+    parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+    args = parser.parse_args(argv)
+
+    with open(args.policy) as f:
+        definition = loads(f.read())
+    # Accept a whole policy file, as used by drift.py, as well as a bare definition.
+    definition = definition.get('definition', definition)
+    rows = simulate(load_usage(args.usage), definition, price_per_dbu=args.price_per_dbu)
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        print(pd.DataFrame(rows).to_string(index=False))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
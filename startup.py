@@ -0,0 +1,165 @@
+"""Cold start profiling for the app, and lazy imports to keep cold starts short.
+
+The app marks the end of each phase of its first run (imports, config, ...) and prints
+how long each took to stderr, once per process. To profile imports offline, without a workspace:
+
+    python startup.py
+
+prints the import time of each module the app imports on startup, and
+
+    python startup.py --check
+
+exits with code 1 when startup imports regress: when a module meant to be imported lazily
+is imported eagerly, or when the app's own modules take longer than the budget to import.
+"""
+import argparse
+import ast
+import importlib.util
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+from types import ModuleType
+
+APP_PATH = Path(__file__).with_name('app.py')
+# Modules only some code paths need. Importing one of these on startup is a regression.
+LAZY_MODULES = ('fleet', 'regex_tester', 'simulate', 'multiprocessing')
+DEFAULT_BUDGET_MS = 100
+DEFAULT_RUNS = 5
+
+
+def lazy_import(name: str) -> ModuleType:
+    """Import a module whose code only runs the first time one of its attributes is used"""
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    spec.loader = importlib.util.LazyLoader(spec.loader)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+class StartupProfile:
+    """Durations of the phases of the first app run in this process.
+
+    The first phase starts when this module is imported, so the app imports it first.
+    """
+
+    def __init__(self):
+        self.phases: dict[str, float] = {}
+        self.finished = False
+        self._phase_started = time.perf_counter()
+
+    def mark(self, phase: str):
+        """End `phase` here, and start the next one"""
+        if self.finished:
+            return
+        now = time.perf_counter()
+        self.phases[phase] = now - self._phase_started
+        self._phase_started = now
+
+    def finish(self, phase: str):
+        """End the last phase and report every phase"""
+        if self.finished:
+            return
+        self.mark(phase)
+        self.finished = True
+        total = sum(self.phases.values())
+        summary = ', '.join(f'{name} {seconds:.3f}s' for name, seconds in self.phases.items())
+        print(f'Cold start took {total:.3f}s: {summary}', file=sys.stderr)
+
+
+startup_profile = StartupProfile()
+
+
+# ===== Import Profiling =====
+
+def _module_statements(nodes: list[ast.stmt]):
+    for node in nodes:
+        if isinstance(node, ast.With):
+            yield from _module_statements(node.body)
+        else:
+            yield node
+
+def startup_imports(app_path: Path = APP_PATH) -> str:
+    """The imports and lazy imports the app runs at module level, as source code"""
+    statements = []
+    for node in _module_statements(ast.parse(app_path.read_text()).body):
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            statements.append(ast.unparse(node))
+        elif isinstance(node, ast.Assign) and isinstance(node.value, ast.Call) \
+                and getattr(node.value.func, 'id', None) == 'lazy_import':
+            statements.append(ast.unparse(node))
+    return '\n'.join(statements)
+
+def _profile_once(code: str) -> tuple[dict[str, tuple[int, int]], list[str]]:
+    # A fresh interpreter per run, so nothing is imported already.
+    probe = code + (
+        '\nimport json, sys\n'
+        "print(json.dumps([n for n, m in list(sys.modules.items()) if type(m).__name__ != '_LazyModule']))"
+    )
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', probe],
+        cwd=APP_PATH.parent, capture_output=True, text=True, check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        # Nested imports are indented by two spaces per level.
+        times[name[1:].rstrip()] = (int(self_us), int(cumulative_us))
+    return times, json.loads(result.stdout.splitlines()[-1])
+
+def _first_party(name: str) -> bool:
+    return (APP_PATH.parent / f'{name}.py').exists()
+
+def profile_imports(runs: int = DEFAULT_RUNS) -> tuple[dict[str, tuple[int, int]], list[str]]:
+    """Fastest self and cumulative import time of each module in microseconds, and the modules imported"""
+    code = startup_imports()
+    best: dict[str, tuple[int, int]] = {}
+    for _ in range(runs):
+        times, imported = _profile_once(code)
+        for name, (self_us, cumulative_us) in times.items():
+            previous = best.get(name)
+            best[name] = (self_us, cumulative_us) if previous is None else (
+                min(previous[0], self_us), min(previous[1], cumulative_us)
+            )
+    return best, imported
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Profile and check the app's startup imports.")
+    parser.add_argument('--check', action='store_true', help='Exit with code 1 if startup imports regressed')
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS,
+                        help=f"Max import time of the app's own modules (default: {DEFAULT_BUDGET_MS})")
+    parser.add_argument('--runs', type=int, default=DEFAULT_RUNS, help='Take the fastest of this many runs')
+    args = parser.parse_args(argv)
+
+    times, imported = profile_imports(args.runs)
+    top_level = sorted(
+        ((name, cumulative) for name, (_, cumulative) in times.items() if not name.startswith(' ')),
+        key=lambda item: item[1], reverse=True,
+    )
+    for name, cumulative in top_level:
+        print(f'{cumulative / 1000:10.1f} ms  {name}')
+    first_party_ms = sum(self_us for name, (self_us, _) in times.items() if _first_party(name.strip())) / 1000
+    print(f'{sum(c for _, c in top_level) / 1000:10.1f} ms  total, {first_party_ms:.1f} ms in app modules')
+
+    if not args.check:
+        return 0
+    failures = [
+        f'`{name}` is imported on startup, but should be imported lazily'
+        for name in LAZY_MODULES if name in imported
+    ]
+    if first_party_ms > args.budget_ms:
+        failures.append(f'App modules take {first_party_ms:.1f} ms to import, over the {args.budget_ms:.0f} ms budget')
+    for failure in failures:
+        print(failure, file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,11 @@
+import os
+import threading
+from pathlib import Path
+
+
+def write_atomic(path: Path, body: str):
+    """Write a file so readers, and a crash halfway through, never see it partially written"""
+    # Write then rename. Temporary names are unique per thread, as drafts are written from a background thread.
+    tmp_path = path.with_name(f'.{path.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+    tmp_path.write_text(body)
+    os.replace(tmp_path, path)
@@ -0,0 +1,47 @@
+from attribute_trie import AttributeTrie, path_matches, split_path
+
+RULES = {
+    'init_scripts.*.s3.destination': {'type': 'regex', 'pattern': 's3://scripts/.*'},
+    'init_scripts.0.s3.destination': {'type': 'fixed', 'value': 's3://scripts/first.sh'},
+    'init_scripts.1.volumes.destination': {'type': 'fixed', 'value': '/Volumes/a/b/c.sh'},
+    'spark_conf.spark.executor.memory': {'type': 'fixed', 'value': '4g'},
+    'autotermination_minutes': {'type': 'range', 'maxValue': 60},
+}
+
+
+def test_split_path_keeps_map_keys_whole():
+    assert split_path('spark_conf.spark.executor.memory') == ('spark_conf', 'spark.executor.memory')
+    assert split_path('init_scripts.0.s3.destination') == ('init_scripts', '0', 's3', 'destination')
+    assert split_path('custom_tags') == ('custom_tags',)
+
+def test_governing_finds_exact_and_wildcard_rules():
+    trie = AttributeTrie(RULES)
+    assert set(trie.governing('init_scripts.0.s3.destination')) == {
+        'init_scripts.0.s3.destination', 'init_scripts.*.s3.destination',
+    }
+    assert set(trie.governing('init_scripts.7.s3.destination')) == {'init_scripts.*.s3.destination'}
+    assert trie.governing('init_scripts.7.volumes.destination') == {}
+    assert trie.governing('init_scripts.0.s3') == {}
+    assert set(trie.governing('spark_conf.spark.executor.memory')) == {'spark_conf.spark.executor.memory'}
+
+def test_governed_finds_only_concrete_rules():
+    trie = AttributeTrie(RULES)
+    assert trie.governed('init_scripts.*.s3.destination') == ['init_scripts.0.s3.destination']
+    assert trie.governed('init_scripts.*.volumes.destination') == ['init_scripts.1.volumes.destination']
+    assert trie.governed('autotermination_minutes') == ['autotermination_minutes']
+    assert trie.governed('init_scripts.*') == []
+
+def test_get_matches_wildcards_literally():
+    trie = AttributeTrie(RULES)
+    assert trie.get('init_scripts.*.s3.destination') == RULES['init_scripts.*.s3.destination']
+    assert trie.get('init_scripts.5.s3.destination') is None
+    assert trie.get('init_scripts.0') is None
+
+def test_governing_agrees_with_path_matches():
+    trie = AttributeTrie(RULES)
+    paths = [
+        'init_scripts.0.s3.destination', 'init_scripts.3.s3.destination', 'init_scripts.1.volumes.destination',
+        'spark_conf.spark.executor.memory', 'spark_conf.spark.driver.memory', 'autotermination_minutes',
+    ]
+    for path in paths:
+        assert set(trie.governing(path)) == {rule for rule in RULES if path_matches(rule, path)}, path
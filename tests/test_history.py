@@ -0,0 +1,72 @@
+import pytest
+
+import history
+from history import DraftHistory, PersistentMap
+
+
+def test_set_returns_new_map_and_keeps_old_one():
+    before = PersistentMap.from_dict({'a': 1})
+    after = before.set('b', 2).set('a', 3)
+    assert before.to_dict() == {'a': 1}
+    assert after.to_dict() == {'a': 3, 'b': 2}
+    assert len(before) == 1
+    assert len(after) == 2
+
+def test_many_keys_round_trip():
+    values = {f'spark_conf.key{i}': i for i in range(5000)}
+    persistent = PersistentMap.from_dict(values)
+    assert persistent.to_dict() == values
+    assert len(persistent) == len(values)
+    assert 'spark_conf.key4999' in persistent
+    assert 'spark_conf.key5000' not in persistent
+
+@pytest.mark.parametrize('colliding_hash', [lambda key: 0, lambda key: history._HASH_MASK])
+def test_full_hash_collisions_fall_back_to_buckets_at_max_depth(monkeypatch, colliding_hash):
+    # Every key has the same hash, so all of them end up in one bucket past `_MAX_DEPTH`.
+    monkeypatch.setattr(history, '_hash', colliding_hash)
+    persistent = PersistentMap()
+    for i in range(20):
+        persistent = persistent.set(f'key{i}', i)
+    overwritten = persistent.set('key3', 'new')
+
+    assert len(persistent) == 20
+    assert len(overwritten) == 20
+    assert persistent.get('key3') == 3
+    assert overwritten.get('key3') == 'new'
+    assert persistent.get('missing', 'default') == 'default'
+    assert dict(overwritten.items()) == {**{f'key{i}': i for i in range(20)}, 'key3': 'new'}
+
+def test_partial_hash_collisions(monkeypatch):
+    # Keys share the low bits, so they collide for a few levels and then split.
+    monkeypatch.setattr(history, '_hash', lambda key: int(key[3:]) << (history._BITS * 4))
+    persistent = PersistentMap.from_dict({f'key{i}': i for i in range(100)})
+    assert persistent.to_dict() == {f'key{i}': i for i in range(100)}
+
+
+def test_commit_after_undo_drops_the_redo_tail():
+    draft = DraftHistory('New policy', {}, {})
+    draft.set_attribute('Set a', 'a', 1)
+    draft.set_attribute('Set b', 'b', 2)
+    draft.undo()
+    assert draft.can_redo()
+
+    draft.set_attribute('Set c', 'c', 3)
+    assert not draft.can_redo()
+    assert [s.label for s in draft.snapshots] == ['New policy', 'Set a', 'Set c']
+    assert draft.current.definition.to_dict() == {'a': 1, 'c': 3}
+
+def test_undo_and_redo_move_between_snapshots():
+    draft = DraftHistory('New policy', {'a': 1}, {})
+    draft.set_attribute('Override b', 'b', 2, override=True)
+    assert draft.undo().overrides.to_dict() == {}
+    assert not draft.can_undo()
+    assert draft.redo().overrides.to_dict() == {'b': 2}
+    # Overriding leaves the definition's map shared with the previous snapshot.
+    assert draft.snapshots[0].definition is draft.snapshots[1].definition
+
+def test_jump_out_of_range():
+    draft = DraftHistory('New policy', {}, {})
+    with pytest.raises(IndexError):
+        draft.jump(1)
+    with pytest.raises(IndexError):
+        draft.undo()
@@ -0,0 +1,47 @@
+import re
+
+import pytest
+
+from runtimes import allowlist_to_regex
+
+RUNTIME_KEYS = [
+    '13.3.x-scala2.12', '13.3.x-cpu-ml-scala2.12', '13.3.x-gpu-ml-scala2.12',
+    '14.3.x-scala2.12', '14.3.x-cpu-ml-scala2.12', '14.3.x-photon-scala2.12',
+    '15.4.x-scala2.12', '15.4.x-cpu-ml-scala2.12', '15.4.x-gpu-ml-scala2.12', '15.4.x-photon-scala2.12',
+    '16.4.x-scala2.12', '16.4.x-scala2.13',
+]
+
+
+@pytest.mark.parametrize('values', [
+    RUNTIME_KEYS,
+    ['15.4.x-scala2.12'],
+    ['15.4.x-scala2.12', '15.4.x-photon-scala2.12'],
+    ['custom-runtime', '15.4.x-scala2.12', 'apache-spark-2.4.x-scala2.11'],
+    ['a.b', 'a+b', 'a[b]', 'a(b)', 'a|b'],
+])
+def test_matches_exactly_the_allowlist(values):
+    pattern = re.compile(allowlist_to_regex(values))
+    for value in values:
+        assert pattern.fullmatch(value), value
+        assert pattern.match(value), value
+        # Anchored: neither a longer nor a shorter key matches.
+        assert not pattern.match(value + 'x'), value
+        assert not pattern.match(value[:-1]), value
+
+def test_rejects_keys_outside_the_allowlist():
+    pattern = re.compile(allowlist_to_regex(RUNTIME_KEYS))
+    rejected = [
+        '13.3.x-photon-scala2.12',  # a suffix that exists, but not for this version
+        '16.4.x-cpu-ml-scala2.12',
+        '12.2.x-scala2.12',
+        '15.4x-scala2.12',  # `.` is literal
+        '1534.x-scala2.12',
+        '15.4.x-scala2.1',
+    ]
+    for value in rejected:
+        assert not pattern.match(value), value
+
+def test_is_anchored_and_order_independent():
+    pattern = allowlist_to_regex(RUNTIME_KEYS)
+    assert pattern.startswith('^') and pattern.endswith('$')
+    assert allowlist_to_regex(list(reversed(RUNTIME_KEYS)) + RUNTIME_KEYS[:2]) == pattern
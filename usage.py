@@ -0,0 +1,124 @@
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+
+from databricks.sdk import WorkspaceClient
+from databricks.sdk.service.jobs import BaseJob
+
+from workspaces import DEFAULT_REFRESH_SECONDS
+
+# Page sizes for the list APIs, the largest each one accepts.
+CLUSTERS_PAGE_SIZE = 100
+JOBS_PAGE_SIZE = 100
+
+
+@dataclass(frozen=True)
+class PolicyUsage:
+    clusters: int = 0
+    jobs: int = 0
+
+    @property
+    def total(self) -> int:
+        return self.clusters + self.jobs
+
+
+def job_policy_ids(job: BaseJob) -> set[str]:
+    """Policies used by the job clusters and task clusters of a job"""
+    settings = job.settings
+    if settings is None:
+        return set()
+    specs = [c.new_cluster for c in settings.job_clusters or []]
+    specs += [t.new_cluster for t in settings.tasks or []]
+    return {spec.policy_id for spec in specs if spec is not None and spec.policy_id}
+
+
+def _decrement(counts: Counter, key: str):
+    counts[key] -= 1
+    if counts[key] <= 0:
+        del counts[key]
+
+
+class PolicyUsageTracker:
+    """Counts of clusters and jobs per policy, kept up to date by a background thread.
+
+    Every refresh streams the workspace's clusters and jobs page by page and updates the
+    counts in place, one cluster or job at a time, so readers always get the latest
+    complete-or-partial table without waiting for a refresh or calling the API per policy.
+    """
+
+    def __init__(self, w: WorkspaceClient, refresh_seconds: float = DEFAULT_REFRESH_SECONDS):
+        self._w = w
+        self._refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        # What each cluster and job last contributed, so changes can be applied incrementally.
+        self._cluster_policy: dict[str, str] = {}
+        self._job_policies: dict[int, frozenset[str]] = {}
+        self._cluster_counts: Counter = Counter()
+        self._job_counts: Counter = Counter()
+        self.last_refreshed: float | None = None
+        self.error: str | None = None
+
+    def usage(self) -> dict[str, PolicyUsage]:
+        with self._lock:
+            policy_ids = self._cluster_counts.keys() | self._job_counts.keys()
+            return {
+                policy_id: PolicyUsage(self._cluster_counts[policy_id], self._job_counts[policy_id])
+                for policy_id in policy_ids
+            }
+
+    @property
+    def refreshing(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def refresh_in_background(self, force: bool = False):
+        """Start a refresh unless one is running or the counts are still fresh"""
+        if self.refreshing:
+            return
+        if not force and self.last_refreshed and time.time() - self.last_refreshed < self._refresh_seconds:
+            return
+        self._thread = threading.Thread(target=self._refresh, name='policy-usage-refresh', daemon=True)
+        self._thread.start()
+
+    def _set_cluster(self, cluster_id: str, policy_id: str | None):
+        with self._lock:
+            previous = self._cluster_policy.pop(cluster_id, None)
+            if previous:
+                _decrement(self._cluster_counts, previous)
+            if policy_id:
+                self._cluster_policy[cluster_id] = policy_id
+                self._cluster_counts[policy_id] += 1
+
+    def _set_job(self, job_id: int, policy_ids: frozenset[str]):
+        with self._lock:
+            previous = self._job_policies.pop(job_id, frozenset())
+            for policy_id in previous - policy_ids:
+                _decrement(self._job_counts, policy_id)
+            for policy_id in policy_ids - previous:
+                self._job_counts[policy_id] += 1
+            if policy_ids:
+                self._job_policies[job_id] = policy_ids
+
+    def _refresh(self):
+        try:
+            seen_clusters = set()
+            for cluster in self._w.clusters.list(page_size=CLUSTERS_PAGE_SIZE):
+                seen_clusters.add(cluster.cluster_id)
+                if self._cluster_policy.get(cluster.cluster_id) != cluster.policy_id:
+                    self._set_cluster(cluster.cluster_id, cluster.policy_id)
+            for cluster_id in self._cluster_policy.keys() - seen_clusters:
+                self._set_cluster(cluster_id, None)
+
+            seen_jobs = set()
+            for job in self._w.jobs.list(expand_tasks=True, limit=JOBS_PAGE_SIZE):
+                seen_jobs.add(job.job_id)
+                self._set_job(job.job_id, frozenset(job_policy_ids(job)))
+            for job_id in self._job_policies.keys() - seen_jobs:
+                self._set_job(job_id, frozenset())
+
+            self.error = None
+        except Exception as e:
+            self.error = str(e)
+        finally:
+            self.last_refreshed = time.time()
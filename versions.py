@@ -0,0 +1,97 @@
+import json
+import os
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+
+from canonical import canonical_json, content_hash, loads
+from storage import write_atomic
+
+DEFAULT_VERSION_STORE_DIR = os.environ.get('POLICY_VERSION_STORE_DIR', '.policy_versions')
+
+
+@dataclass(frozen=True)
+class PolicyVersion:
+    """One recorded state of a policy. Definitions are stored as manifests of attribute blob hashes."""
+    policy_id: str
+    recorded_at: str
+    kind: str  # `before` or `after` a save, or `rollback`
+    name: str | None
+    description: str | None
+    max_clusters_per_user: int | None
+    policy_family_id: str | None
+    definition: str
+    overrides: str
+
+
+class PolicyVersionStore:
+    """Local, append-only, content-addressed history of saved policies.
+
+    Layout under `root`:
+      objects/ab/cdef...   one blob per distinct attribute (name + value) or manifest
+      index/<policy_id>    one JSON line per recorded version, in time order
+
+    Each attribute is stored once no matter how many versions contain it, so saving a
+    policy that differs by one attribute only adds that attribute and a new manifest.
+    """
+
+    def __init__(self, root: str | Path = DEFAULT_VERSION_STORE_DIR):
+        self.root = Path(root)
+        (self.root / 'objects').mkdir(parents=True, exist_ok=True)
+        (self.root / 'index').mkdir(parents=True, exist_ok=True)
+
+    # ===== Objects =====
+
+    def _object_path(self, digest: str) -> Path:
+        return self.root / 'objects' / digest[:2] / digest[2:]
+
+    def _put(self, obj) -> str:
+        digest = content_hash(obj)
+        path = self._object_path(digest)
+        if not path.exists():
+            path.parent.mkdir(exist_ok=True)
+            write_atomic(path, canonical_json(obj))
+        return digest
+
+    def _get(self, digest: str):
+        return loads(self._object_path(digest).read_bytes())
+
+    def put_definition(self, definition: dict) -> str:
+        """Store each attribute as its own blob and return the hash of the definition's manifest"""
+        manifest = sorted(self._put([name, value]) for name, value in definition.items())
+        return self._put(manifest)
+
+    def get_definition(self, manifest_digest: str) -> dict:
+        return dict(self._get(digest) for digest in self._get(manifest_digest))
+
+    # ===== Index =====
+
+    def _index_path(self, policy_id: str) -> Path:
+        return self.root / 'index' / policy_id
+
+    def record(self, policy_id: str, kind: str, name: str | None, description: str | None,
+               max_clusters_per_user: int | None, policy_family_id: str | None,
+               definition: dict, overrides: dict) -> PolicyVersion:
+        version = PolicyVersion(
+            policy_id=policy_id,
+            recorded_at=datetime.now(timezone.utc).isoformat(),
+            kind=kind,
+            name=name,
+            description=description,
+            max_clusters_per_user=max_clusters_per_user,
+            policy_family_id=policy_family_id,
+            definition=self.put_definition(definition),
+            overrides=self.put_definition(overrides),
+        )
+        with open(self._index_path(policy_id), 'a') as f:
+            f.write(json.dumps(asdict(version)) + '\n')
+        return version
+
+    def list_versions(self, policy_id: str) -> list[PolicyVersion]:
+        """All recorded versions of a policy, newest first"""
+        path = self._index_path(policy_id)
+        if not path.exists():
+            return []
+        with open(path) as f:
+            versions = [PolicyVersion(**json.loads(line)) for line in f if line.strip()]
+        return versions[::-1]
@@ -0,0 +1,108 @@
+import configparser
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+from databricks.sdk import WorkspaceClient
+from databricks.sdk.service.compute import Policy
+
+from canonical import content_hash, policy_content
+
+CURRENT_WORKSPACE = 'current'
+DEFAULT_MAX_TARGETS = 8
+# Keep well under a workspace's API rate limits when sending it many requests at once.
+DEFAULT_MAX_REQUESTS = 8
+# How long background scans of a workspace, such as policy usage and permissions, are reused.
+DEFAULT_REFRESH_SECONDS = 15 * 60
+
+
+def list_profiles() -> list[str]:
+    """Profiles in the Databricks CLI config file, each of which is a workspace policies can be promoted to"""
+    config_file = Path(os.environ.get('DATABRICKS_CONFIG_FILE', '~/.databrickscfg')).expanduser()
+    if not config_file.exists():
+        return []
+    parser = configparser.ConfigParser()
+    parser.read(config_file)
+    return [name for name in parser.sections() if parser.has_option(name, 'host')]
+
+def profile_client(profile: str) -> WorkspaceClient:
+    # Every client has its own API client, and with it its own HTTP connection pool.
+    return WorkspaceClient(profile=profile)
+
+def policy_fingerprint(policy: Policy) -> str:
+    """Short hash of the policy's content, the same content saving and drift detection compare"""
+    return content_hash(policy_content(policy))[:8]
+
+
+# ===== Drift =====
+
+def drift_matrix(catalogs: dict[str, list[Policy]], reference: str = CURRENT_WORKSPACE) -> list[dict]:
+    """One row per policy name, with each workspace's copy compared to the reference workspace's"""
+    fingerprints: dict[str, dict[str, str]] = {}
+    for workspace, policies in catalogs.items():
+        for policy in policies:
+            fingerprints.setdefault(policy.name, {})[workspace] = policy_fingerprint(policy)
+
+    rows = []
+    for name in sorted(fingerprints):
+        by_workspace = fingerprints[name]
+        expected = by_workspace.get(reference)
+        row = {'policy': name}
+        for workspace in catalogs:
+            fingerprint = by_workspace.get(workspace)
+            if fingerprint is None:
+                row[workspace] = 'missing'
+            elif workspace == reference or expected is None:
+                row[workspace] = fingerprint
+            else:
+                row[workspace] = 'same' if fingerprint == expected else f'differs ({fingerprint})'
+        rows.append(row)
+    return rows
+
+
+# ===== Promotion =====
+
+@dataclass(frozen=True)
+class PromotionResult:
+    workspace: str
+    ok: bool
+    policy_id: str | None = None
+    created: bool = False
+    error: str | None = None
+
+
+def _promote(policy: Policy, workspace: str, w: WorkspaceClient, existing: Policy | None) -> PromotionResult:
+    request_args = {
+        'name': policy.name,
+        'description': policy.description,
+        'max_clusters_per_user': policy.max_clusters_per_user,
+        'libraries': policy.libraries,
+    }
+    # Policy families are built into Databricks, so family ids are the same in every workspace.
+    if policy.policy_family_id:
+        request_args['policy_family_id'] = policy.policy_family_id
+        request_args['policy_family_definition_overrides'] = policy.policy_family_definition_overrides
+    else:
+        request_args['definition'] = policy.definition
+    try:
+        if existing:
+            w.cluster_policies.edit(policy_id=existing.policy_id, **request_args)
+            return PromotionResult(workspace, ok=True, policy_id=existing.policy_id)
+        resp = w.cluster_policies.create(**request_args)
+        return PromotionResult(workspace, ok=True, policy_id=resp.policy_id, created=True)
+    except Exception as e:
+        return PromotionResult(workspace, ok=False, error=str(e))
+
+def promote_policy(policy: Policy, targets: dict[str, WorkspaceClient], catalogs: dict[str, list[Policy]],
+                   max_workers: int = DEFAULT_MAX_TARGETS) -> list[PromotionResult]:
+    """Create or update the same-named policy in every target workspace concurrently.
+
+    Existing policies are looked up in the cached `catalogs` of the targets rather than listed again.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = []
+        for workspace, w in targets.items():
+            existing = next((p for p in catalogs.get(workspace, []) if p.name == policy.name), None)
+            futures.append(pool.submit(_promote, policy, workspace, w, existing))
+        return [future.result() for future in futures]